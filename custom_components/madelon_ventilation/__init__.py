@@ -1,32 +1,145 @@
-from homeassistant.core import HomeAssistant
+from homeassistant.core import Event, HomeAssistant
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.const import Platform, CONF_HOST, CONF_PORT
-from homeassistant.helpers.discovery import async_load_platform
-from .const import DOMAIN, DEFAULT_PORT, DEFAULT_UNIT_ID, CONF_UNIT_ID
+from homeassistant.const import Platform, CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL, EVENT_HOMEASSISTANT_STOP
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
+from .const import DOMAIN, DATA_HUB, DATA_STORES, DEFAULT_PORT, DEFAULT_UNIT_ID, DEFAULT_SCAN_INTERVAL, CONF_UNIT_ID
 
+from .coordinator import MadelonCoordinator
 from .fresh_air_controller import FreshAirSystem
+from .hub import ModbusHub
+from .services import async_setup_services
+from .storage import SnapshotStore
 import logging
 
 PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.FAN, Platform.SWITCH]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Register the integration services."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up the Fresh Air System from a config entry."""
     hass.data.setdefault(DOMAIN, {})
+    host = config_entry.data[CONF_HOST]
+    port = config_entry.data.get(CONF_PORT, DEFAULT_PORT)
+
+    # Units behind the same gateway share one serialized connection
+    hub = hass.data.setdefault(DATA_HUB, ModbusHub())
+    scan_interval = config_entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+    system = FreshAirSystem(
+        host=host,
+        port=port,
+        unit_id=config_entry.data.get(CONF_UNIT_ID, DEFAULT_UNIT_ID),
+        modbus=hub.acquire(host, port),
+        scan_interval=scan_interval,
+    )
+    coordinator = MadelonCoordinator(
+        hass,
+        system,
+        scan_interval=scan_interval,
+        store=_snapshot_store(hass, config_entry.entry_id),
+    )
+    logging.getLogger(__name__).info("Setting up Madelon Ventilation entry")
+
+    # Start from the last known registers instead of waiting for the gateway
+    if not await coordinator.async_restore():
+        logging.getLogger(__name__).debug("No stored snapshot, entities start unknown")
+
     hass.data[DOMAIN][config_entry.entry_id] = {
-        "system": FreshAirSystem(
-            host=config_entry.data[CONF_HOST],
-            port=config_entry.data.get(CONF_PORT, DEFAULT_PORT),
-            unit_id=config_entry.data.get(CONF_UNIT_ID, DEFAULT_UNIT_ID)
-        )
+        "system": system,
+        "coordinator": coordinator,
     }
-    logging.getLogger(__name__).info("Setting up Madelon Ventilation entry")
+
+    # Fail fast and mark entities unavailable while the gateway is down
+    config_entry.async_on_unload(
+        system.modbus.add_state_listener(coordinator.async_connection_state_changed)
+    )
+
+    # Measurements are not saved as they drift, keep the latest ones across restarts
+    async def _async_flush_on_stop(event: Event) -> None:
+        await coordinator.async_flush_snapshot()
+
+    config_entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_flush_on_stop)
+    )
+
+    # Apply option changes (scan interval) in place instead of reloading
+    config_entry.async_on_unload(config_entry.add_update_listener(async_update_options))
 
     # Forward the setup to the platforms
-    await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    try:
+        await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    except Exception:
+        await _async_teardown(hass, config_entry)
+        raise
+
+    # One block read per interval, shared by every entity of this device.
+    # The first one runs in the background so startup never waits on the gateway.
+    config_entry.async_create_background_task(
+        hass, coordinator.async_refresh(), f"{DOMAIN} first refresh {config_entry.entry_id}"
+    )
     return True
 
+
+async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
+    """Unload a config entry."""
+    unload_ok = await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
+    if unload_ok:
+        await _async_teardown(hass, config_entry)
+    return unload_ok
+
+
+async def _async_teardown(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Stop polling and release everything the entry holds.
+
+    Listeners registered with config_entry.async_on_unload (gateway state,
+    options) and entity subscriptions (async_on_remove) are removed by Home
+    Assistant itself; this covers the rest.
+    """
+    data = hass.data[DOMAIN].pop(config_entry.entry_id, None)
+    if data is None:
+        return
+    # Cancels the scheduled refresh and the request_refresh debouncer, and writes the
+    # latest snapshot now: a delayed save could land after the entry is removed
+    await data["coordinator"].async_shutdown()
+    data["system"].close()
+    # Closes the socket (and its reconnect probe) when this was the last unit on the gateway
+    hass.data[DATA_HUB].release(
+        config_entry.data[CONF_HOST],
+        config_entry.data.get(CONF_PORT, DEFAULT_PORT),
+    )
+
+
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Delete the stored snapshot when the entry is removed."""
+    # Same Store instance as the entry used, so a pending delayed save is cancelled
+    store = hass.data.get(DATA_STORES, {}).pop(config_entry.entry_id, None)
+    if store is None:
+        store = SnapshotStore(hass, config_entry.entry_id)
+    await store.async_remove()
+
+
+def _snapshot_store(hass: HomeAssistant, entry_id: str) -> SnapshotStore:
+    """The entry's SnapshotStore, one instance for the life of the entry."""
+    stores = hass.data.setdefault(DATA_STORES, {})
+    if entry_id not in stores:
+        stores[entry_id] = SnapshotStore(hass, entry_id)
+    return stores[entry_id]
+
+
+async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Handle options update."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    coordinator.async_set_scan_interval(
+        config_entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+    )
+
 # async def async_remove_config_entry_device(
 #     hass: HomeAssistant, config_entry: ConfigEntry, device_entry: DeviceEntry
 # ) -> bool:
@@ -0,0 +1,103 @@
+"""Priority scheduling of transactions on one gateway's RS485 bus."""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from enum import IntEnum
+import heapq
+import itertools
+
+from .clock import SYSTEM_CLOCK, Clock
+from .const import BUS_MAX_IN_FLIGHT, BUS_MIN_FRAME_GAP
+from .metrics import BusMetrics
+
+
+class Priority(IntEnum):
+    """Lower value goes first; equal priorities keep arrival order."""
+
+    INTERACTIVE = 0  # writes triggered by the user
+    CONFIRM = 1  # read-back of a write
+    POLL = 2  # periodic coordinator reads
+    BACKGROUND = 3  # slow or static registers, reconnect probes
+
+
+class BusScheduler:
+    """Grant bus slots by priority instead of arrival order.
+
+    A user write therefore waits for at most the transaction already on the
+    bus, never for polls queued before it. Between two transactions the bus
+    stays silent for ``min_gap`` seconds; at most ``max_in_flight``
+    transactions run at once.
+    """
+
+    def __init__(
+        self,
+        min_gap: float = BUS_MIN_FRAME_GAP,
+        max_in_flight: int = BUS_MAX_IN_FLIGHT,
+        clock: Clock = SYSTEM_CLOCK,
+    ) -> None:
+        self.min_gap = min_gap
+        self.max_in_flight = max_in_flight
+        self.metrics = BusMetrics()
+        self._clock = clock
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_release = float("-inf")
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests currently waiting for the bus."""
+        return self._waiting
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority):
+        """Hold the bus for one transaction."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: Priority) -> None:
+        queued_at = self._clock.monotonic()
+        if self._in_flight < self.max_in_flight and not self._waiting:
+            self._in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (priority, next(self._sequence), future))
+            self._waiting += 1
+            self.metrics.record_depth(self._waiting)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # Still queued, _grant skips it
+                    self._waiting -= 1
+                else:
+                    # Granted just before the cancellation, pass the slot on
+                    self.release()
+                raise
+        try:
+            gap = self._last_release + self.min_gap - self._clock.monotonic()
+            if gap > 0:
+                await asyncio.sleep(gap)
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        self.metrics.record_wait(priority, self._clock.monotonic() - queued_at)
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._last_release = self._clock.monotonic()
+        self._grant()
+
+    def _grant(self) -> None:
+        while self._queue and self._in_flight < self.max_in_flight:
+            _, _, future = heapq.heappop(self._queue)
+            if future.cancelled():
+                continue
+            self._waiting -= 1
+            self._in_flight += 1
+            future.set_result(None)
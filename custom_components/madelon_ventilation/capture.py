@@ -0,0 +1,151 @@
+"""Binary capture of Modbus request/response pairs for offline replay.
+
+File layout (big endian)::
+
+    header  b"MDLCAP" + u8 version
+    record  f64 start      seconds since the capture started
+            f32 latency    seconds until the reply (or the timeout)
+            u8  unit_id
+            u8  function   3, 6 or 16
+            u8  result     RESULT_CODES
+            u16 address
+            u16 count
+            u16 size       payload bytes that follow
+            payload        ok read: the registers returned
+                           ok/exception write: the registers written
+                           exception read: empty
+    exception responses append the exception code as one extra byte.
+
+This module has no Home Assistant imports; the simulator's replay server
+loads it directly.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import struct
+import time
+
+MAGIC = b"MDLCAP"
+VERSION = 1
+
+HEADER = struct.Struct(">6sB")
+RECORD = struct.Struct(">dfBBBHHH")
+
+RESULT_CODES = {"ok": 0, "exception": 1, "timeout": 2, "error": 3}
+RESULT_NAMES = {code: name for name, code in RESULT_CODES.items()}
+
+# Bytes collected in memory before they are written out from the executor
+FLUSH_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class CaptureRecord:
+    start: float
+    latency: float
+    unit_id: int
+    function: int
+    result: str
+    address: int
+    count: int
+    registers: tuple[int, ...]
+    exception_code: int | None = None
+
+
+def encode_record(
+    start: float,
+    latency: float,
+    unit_id: int,
+    function: int,
+    result: str,
+    address: int,
+    count: int,
+    registers=(),
+    exception_code: int | None = None,
+) -> bytes:
+    payload = struct.pack(f">{len(registers)}H", *registers)
+    if exception_code is not None:
+        payload += bytes((exception_code,))
+    return RECORD.pack(
+        start, latency, unit_id, function, RESULT_CODES[result], address, count, len(payload)
+    ) + payload
+
+
+def read_capture(path: str) -> list[CaptureRecord]:
+    """Load every record of a capture file."""
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} Madelon capture")
+    records = []
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data):
+        start, latency, unit_id, function, result, address, count, size = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        payload = data[offset:offset + size]
+        offset += size
+        exception_code = None
+        if RESULT_NAMES[result] == "exception":
+            exception_code = payload[-1]
+            payload = payload[:-1]
+        records.append(CaptureRecord(
+            start, latency, unit_id, function, RESULT_NAMES[result], address, count,
+            struct.unpack(f">{len(payload) // 2}H", payload), exception_code,
+        ))
+    return records
+
+
+class CaptureWriter:
+    """Append records to a capture file without blocking the event loop.
+
+    Records are packed into memory and written from the default executor in
+    chunks; chunks are chained so they land in order.
+    """
+
+    def __init__(self, path: str, clock=time.monotonic) -> None:
+        self.path = path
+        self.records = 0
+        self._clock = clock
+        self._started = clock()
+        self._file = None
+        self._buffer = bytearray(HEADER.pack(MAGIC, VERSION))
+        self._pending: asyncio.Future | None = None
+
+    async def async_open(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._file = await loop.run_in_executor(None, open, self.path, "wb")
+
+    def record(self, started: float, ended: float, unit_id: int, function: int, result: str,
+               address: int, count: int, registers=(), exception_code: int | None = None) -> None:
+        """Add one transaction; ``started``/``ended`` are clock() readings."""
+        self._buffer += encode_record(
+            started - self._started, ended - started, unit_id, function, result,
+            address, count, registers, exception_code,
+        )
+        self.records += 1
+        if len(self._buffer) >= FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer or self._file is None:
+            return
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        previous = self._pending
+        self._pending = asyncio.ensure_future(self._write(chunk, previous))
+
+    async def _write(self, chunk: bytes, previous: asyncio.Future | None) -> None:
+        if previous is not None:
+            await previous
+        await asyncio.get_running_loop().run_in_executor(None, self._file.write, chunk)
+
+    async def async_close(self) -> None:
+        """Write what is left and close the file."""
+        self._flush()
+        if self._pending is not None:
+            await self._pending
+            self._pending = None
+        if self._file is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._file.close)
+            self._file = None
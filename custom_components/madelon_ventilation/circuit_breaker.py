@@ -0,0 +1,110 @@
+"""Circuit breaker with jittered exponential backoff for gateway connections."""
+from __future__ import annotations
+
+from enum import Enum
+import random
+import time
+
+from .const import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    RECONNECT_BACKOFF_BASE,
+    RECONNECT_BACKOFF_MAX,
+    RECONNECT_JITTER,
+)
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"  # connection healthy, requests go through
+    OPEN = "open"  # gateway failing, requests fail fast
+    HALF_OPEN = "half_open"  # one probe is testing the connection
+
+
+class CircuitBreaker:
+    """Track connection failures and decide when requests may be attempted.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    every request is rejected without touching the network. Once the backoff
+    delay has passed, a single probe is allowed (half-open); its result
+    closes the circuit or reopens it with a doubled, jittered delay.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        base_delay: float = RECONNECT_BACKOFF_BASE,
+        max_delay: float = RECONNECT_BACKOFF_MAX,
+        jitter: float = RECONNECT_JITTER,
+        clock=time.monotonic,
+        rand=random.random,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._clock = clock
+        self._rand = rand
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._opened = 0  # consecutive openings, drives the backoff exponent
+        self._retry_at = 0.0
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until a probe is allowed (0 when not open)."""
+        if self.state is not CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self._retry_at - self._clock())
+
+    @property
+    def rejecting(self) -> bool:
+        """True while requests fail fast: backoff running or a probe in flight.
+
+        Unlike allow_request() this does not move the circuit to half-open.
+        """
+        if self.state is CircuitState.CLOSED:
+            return False
+        return self.state is CircuitState.HALF_OPEN or self._clock() < self._retry_at
+
+    def allow_request(self) -> bool:
+        """Return True if a request may go to the network now.
+
+        When the backoff has expired this moves the circuit to half-open and
+        admits exactly one caller, which must report the outcome.
+        """
+        if self.state is CircuitState.CLOSED:
+            return True
+        if self.state is CircuitState.OPEN and self._clock() >= self._retry_at:
+            self.state = CircuitState.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._opened = 0
+
+    def record_failure(self) -> None:
+        """Count a failure and open the circuit when needed.
+
+        Failures reported while the circuit is already open (requests that
+        were on the wire when it opened) do not extend the backoff.
+        """
+        if self.state is CircuitState.OPEN:
+            return
+        self.failures += 1
+        if self.state is CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._open()
+
+    def trip(self) -> None:
+        """Open the circuit now, e.g. when the gateway accepts connections but no unit answers."""
+        if self.state is not CircuitState.OPEN:
+            self.failures += 1
+            self._open()
+
+    def _open(self) -> None:
+        delay = min(self.base_delay * 2 ** self._opened, self.max_delay)
+        delay *= 1 - self.jitter + 2 * self.jitter * self._rand()
+        self._opened += 1
+        self._retry_at = self._clock() + delay
+        self.state = CircuitState.OPEN
@@ -0,0 +1,22 @@
+"""Injectable time source for the controller."""
+from __future__ import annotations
+
+import time
+
+
+class Clock:
+    """Wall-clock time for timestamps, monotonic time for intervals.
+
+    Sleeping and timeouts go through asyncio, so a clock is only half the
+    story: simulations pair a virtual clock with an event loop reading the
+    same time (see simulator/virtual_time.py).
+    """
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+
+SYSTEM_CLOCK = Clock()
@@ -0,0 +1,73 @@
+"""Last-write-wins coalescing of register writes."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CommandCoalescer:
+    """Collapse bursts of writes (e.g. a dragged slider) into few batches.
+
+    An intent is written right away when nothing is on the wire, so a
+    single command costs no extra latency. While a batch is on the wire, new
+    intents collect into the next one; a later value for the same register
+    replaces the earlier one before it is sent. A burst of N slider events
+    thus costs one batch for the first event plus one per round trip, and
+    the last one carries the final value.
+
+    Every caller waits for the batch that carries its intent, or the newer
+    value that superseded it, and gets that batch's result.
+    """
+
+    def __init__(self, flush: Callable[[dict], Awaitable[bool]]) -> None:
+        self._flush = flush
+        self.superseded = 0  # intents dropped before reaching the wire
+        self._pending: dict = {}
+        self._result: asyncio.Future | None = None
+        self._task: asyncio.Task | None = None
+        # Every batch not yet finished, with its result: earlier ones may still be on the wire
+        self._batches: dict[asyncio.Task, asyncio.Future] = {}
+
+    async def submit(self, values: dict) -> bool:
+        """Queue ``values`` ({register name: raw value}) and wait for the write."""
+        for name, value in values.items():
+            if name in self._pending:
+                self.superseded += 1
+            self._pending[name] = value
+        if self._result is None:
+            loop = asyncio.get_running_loop()
+            self._result = loop.create_future()
+            self._task = loop.create_task(self._run(self._task, self._result))
+            self._batches[self._task] = self._result
+            self._task.add_done_callback(self._batches.pop)
+        # shield: a cancelled caller must not cancel the batch of the others
+        return await asyncio.shield(self._result)
+
+    async def _run(self, previous: asyncio.Task | None, result: asyncio.Future) -> None:
+        try:
+            if previous is not None:
+                # One batch on the wire at a time; meanwhile this one keeps collecting
+                await asyncio.wait([previous])
+            values, self._pending = self._pending, {}
+            self._result = None
+            if self.superseded:
+                _LOGGER.debug(f"Writing coalesced batch {values} ({self.superseded} superseded so far)")
+            result.set_result(await self._flush(values))
+        except asyncio.CancelledError:
+            result.cancel()
+            raise
+        except Exception as err:  # propagate to every waiting caller
+            result.set_exception(err)
+
+    def close(self) -> None:
+        """Stop every outstanding batch and drop pending intents; waiting callers are cancelled."""
+        for task, result in list(self._batches.items()):
+            task.cancel()
+            # A batch cancelled before it started never reaches its own handler
+            result.cancel()
+        self._task = None
+        self._result = None
+        self._pending = {}
@@ -23,6 +23,8 @@ from homeassistant.exceptions import HomeAssistantError
 
 # from .api import API, APIAuthError, APIConnectionError
 from .const import DEFAULT_SCAN_INTERVAL, DOMAIN, MIN_SCAN_INTERVAL, DEFAULT_PORT, DEFAULT_UNIT_ID, CONF_UNIT_ID
+from .const import CONF_DEADBAND, CONF_MIN_INTERVAL, CONF_HEARTBEAT, DEADBAND_SENSORS
+from .filters import deadband_options
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -39,7 +41,12 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
     # Simply return the title without attempting connection
-    return {"title": f"Fresh Air System - {data[CONF_HOST]}"}
+    title = f"Fresh Air System - {data[CONF_HOST]}"
+    # Extra units on the same gateway need their own unique ID
+    unit_id = data.get(CONF_UNIT_ID, DEFAULT_UNIT_ID)
+    if unit_id != DEFAULT_UNIT_ID:
+        title = f"{title} #{unit_id}"
+    return {"title": title}
 
 
 class ExampleConfigFlow(ConfigFlow, domain=DOMAIN):
@@ -141,14 +148,27 @@ class ExampleOptionsFlowHandler(OptionsFlow):
         # It is recommended to prepopulate options fields with default values if available.
         # These will be the same default values you use on your coordinator for setting variable values
         # if the option has not been set.
-        data_schema = vol.Schema(
-            {
+        schema = {
+            vol.Required(
+                CONF_SCAN_INTERVAL,
+                default=self.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+            ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))),
+        }
+        # Deadband filtering per measurement sensor, 0 disables a rule
+        for sensor in DEADBAND_SENSORS:
+            current = deadband_options(self.options, sensor)
+            schema.update({
                 vol.Required(
-                    CONF_SCAN_INTERVAL,
-                    default=self.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
-                ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))),
-            }
-        )
+                    f"{sensor}_{CONF_DEADBAND}", default=current["threshold"]
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Required(
+                    f"{sensor}_{CONF_MIN_INTERVAL}", default=current["min_interval"]
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(
+                    f"{sensor}_{CONF_HEARTBEAT}", default=current["heartbeat"]
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            })
+        data_schema = vol.Schema(schema)
 
         return self.async_show_form(step_id="init", data_schema=data_schema)
 
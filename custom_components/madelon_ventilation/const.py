@@ -1,9 +1,21 @@
 """Constants for the Madelon Ventilation integration."""
 DOMAIN = "madelon_ventilation"
 
-DEFAULT_SCAN_INTERVAL = 60
+# hass.data key for the per-gateway connection registry
+DATA_HUB = f"{DOMAIN}_hub"
+# hass.data key for the per-entry SnapshotStore, kept across reloads until the entry is removed
+DATA_STORES = f"{DOMAIN}_stores"
+
+DEFAULT_SCAN_INTERVAL = 15  # control registers; slower groups use POLL_GROUP_INTERVALS
 MIN_SCAN_INTERVAL = 10
 
+# Adaptive polling
+FAST_SCAN_INTERVAL = 2  # seconds, used right after a write or a detected change
+FAST_POLL_WINDOW = 20  # seconds of fast polling after activity
+STABLE_POLLS_BEFORE_BACKOFF = 5  # unchanged polls before slowing down
+MAX_STABLE_BACKOFF = 2  # max multiple of the scan interval while values are stable
+MAX_FAILURE_BACKOFF = 8  # max multiple of the scan interval while the gateway fails
+
 DEFAULT_PORT = 8899
 DEFAULT_UNIT_ID = 1
 
@@ -13,3 +25,57 @@ CONF_UNIT_ID = "unit_id"
 DEVICE_MANUFACTURER = "Madelon"
 DEVICE_MODEL = "Jinmaofu"
 DEVICE_SW_VERSION = "0.2.2"
+
+# Modbus read planning
+MAX_READ_REGISTERS = 125  # FC03 limit per request
+DEFAULT_GAP_COST = 8  # unused registers worth reading to save one request
+
+# Seconds between reads of each register group (FreshAirSystem.REGISTER_GROUPS).
+# 0 reads the group on every poll, inf once per session (again after the cache is lost).
+POLL_GROUP_INTERVALS = {
+    "control": 0,  # follows the adaptive scan interval
+    "telemetry": 60,
+    "static": 3600,
+}
+
+# Connection circuit breaker
+CIRCUIT_FAILURE_THRESHOLD = 2  # consecutive failures before failing fast
+RECONNECT_BACKOFF_BASE = 1  # seconds before the first reconnect probe
+RECONNECT_BACKOFF_MAX = 300  # cap for the exponential backoff
+RECONNECT_JITTER = 0.2  # +/- fraction of randomness added to each delay
+
+# Sensor deadband filtering, options are stored as "<sensor>_<suffix>"
+CONF_DEADBAND = "deadband"  # minimum absolute change to publish
+CONF_MIN_INTERVAL = "min_interval"  # seconds between two published values
+CONF_HEARTBEAT = "heartbeat"  # seconds after which the value is republished anyway
+DEADBAND_SENSORS = ("temperature", "humidity")
+DEFAULT_DEADBAND = {"temperature": 0.2, "humidity": 1.0}
+DEFAULT_MIN_INTERVAL = 60
+DEFAULT_HEARTBEAT = 900
+
+# Transaction trace
+TRACE_BUFFER_SIZE = 1024  # transactions kept per gateway connection
+SERVICE_DUMP_TRACE = "dump_trace"
+
+# Record-and-replay capture
+SERVICE_START_CAPTURE = "start_capture"
+SERVICE_STOP_CAPTURE = "stop_capture"
+
+# Gateway bus scheduling
+BUS_MIN_FRAME_GAP = 0.02  # seconds of silence between frames, many WiFi bridges drop back-to-back requests
+BUS_MAX_IN_FLIGHT = 1  # RS485 is half-duplex: one transaction at a time
+
+# Idempotent write suppression: seconds a register value read from or written to the
+# unit is trusted. Writing the same value again within that window is skipped;
+# registers not listed are always written. Windows are capped at the scan interval,
+# so a change made on the unit itself is never trusted away for longer than one poll.
+WRITE_CONFIDENCE_WINDOWS = {
+    "power": DEFAULT_SCAN_INTERVAL,  # only the wall panel changes these behind our back
+    "mode": DEFAULT_SCAN_INTERVAL,
+    "supply_speed": 5,  # AUTO mode rewrites the speeds and bypass on its own
+    "exhaust_speed": 5,
+    "bypass": 5,
+}
+
+# Read-back confirmation after writes
+CONFIRM_RETRY_DELAYS = (0.3, 1.0, 2.5)  # seconds before each read-back attempt
@@ -0,0 +1,180 @@
+"""DataUpdateCoordinator for the Madelon Ventilation integration."""
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import DEFAULT_SCAN_INTERVAL, DOMAIN
+from .fresh_air_controller import FreshAirSystem
+from .scheduler import AdaptivePollScheduler, PollDecisions
+from .snapshot import RegisterSnapshot
+from .storage import SnapshotStore
+from .trace import trace_caller
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class MadelonCoordinator(DataUpdateCoordinator[RegisterSnapshot]):
+    """Poll one FreshAirSystem and share its immutable register snapshot."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        system: FreshAirSystem,
+        scan_interval: float = DEFAULT_SCAN_INTERVAL,
+        store: SnapshotStore | None = None,
+    ) -> None:
+        """Initialize the coordinator."""
+        self.system = system
+        self._store = store
+        self._restored: RegisterSnapshot | None = None
+        self._saved: RegisterSnapshot | None = None  # last snapshot handed to the store
+        self._shutdown = False
+        self._confirmation: asyncio.Future | None = None
+        # Same clock as the controller, so simulations drive this scheduler too
+        self.scheduler = AdaptivePollScheduler(scan_interval, clock=system.clock.monotonic)
+        self._decisions = PollDecisions(system, self.scheduler)
+        system.set_cache_ttl(self.scheduler.scan_interval)
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_{system.unique_identifier}",
+            update_interval=timedelta(seconds=self.scheduler.next_interval()),
+        )
+
+    async def _async_update_data(self) -> RegisterSnapshot:
+        """Read the register groups that are due; the snapshot carries the decoded values."""
+        token = trace_caller.set("coordinator")
+        try:
+            ok = await self.system.async_poll()
+        finally:
+            trace_caller.reset(token)
+        data = self.system.registers if ok else None
+        self._decisions.poll_finished(data, self.data)
+        self._apply_schedule()
+        if not ok:
+            raise UpdateFailed(f"Failed to read registers from {self.system.unique_identifier}")
+        self._async_save(data)
+        return data
+
+    async def async_restore(self) -> bool:
+        """Seed the coordinator with the last stored snapshot.
+
+        Entities start from these values (flagged stale) while the first
+        live poll runs in the background.
+        """
+        if self._store is None:
+            return False
+        stored = await self._store.async_load()
+        if stored is None:
+            return False
+        registers, timestamp = stored
+        self.system.restore_registers(registers, timestamp)
+        self._restored = self._saved = self.data = self.system.registers
+        return True
+
+    @property
+    def is_stale(self) -> bool:
+        """True while entities still show the snapshot restored from disk."""
+        return self.data is not None and self.data is self._restored
+
+    @callback
+    def _async_save(self, data: RegisterSnapshot | None) -> None:
+        """Store ``data`` when a control or fan register changed.
+
+        Temperature and humidity drift on nearly every poll; saving for them
+        would rewrite .storage about once a minute. The latest snapshot is
+        still written on unload and on Home Assistant stop (async_flush_snapshot).
+        """
+        if self._store is None or data is None:
+            # No snapshot yet, e.g. a write before the first successful poll
+            return
+        if self._saved is not None and not data.changed_mask(self._saved) & self._decisions.activity_mask:
+            return
+        self._saved = data
+        self._store.async_save(data)
+
+    def _apply_schedule(self) -> None:
+        """Use the scheduler's delay for the next refresh."""
+        self.update_interval = timedelta(seconds=self.scheduler.next_interval())
+
+    @callback
+    def async_set_scan_interval(self, scan_interval: float) -> None:
+        """Apply a new baseline interval without reloading the entry."""
+        self.scheduler.set_scan_interval(scan_interval)
+        self.system.set_cache_ttl(self.scheduler.scan_interval)
+        self._apply_schedule()
+        self._schedule_refresh()
+        _LOGGER.debug(f"Scan interval for {self.system.unique_identifier} set to {scan_interval}s")
+
+    async def async_shutdown(self) -> None:
+        """Stop polling; later gateway state changes are ignored."""
+        self._shutdown = True
+        await super().async_shutdown()
+        await self.async_flush_snapshot()
+
+    async def async_flush_snapshot(self) -> None:
+        """Write the latest snapshot, measurements included, to disk now."""
+        if self._store is None or self.data is None or self.data is self._restored:
+            return
+        if self.data is not self._saved:
+            self._saved = self.data
+            self._store.async_save(self.data)
+        await self._store.async_flush()
+
+    @callback
+    def async_connection_state_changed(self, available: bool) -> None:
+        """React to the gateway circuit breaker opening or closing."""
+        if self._shutdown:
+            return
+        if available:
+            # The background probe restored the link, refresh right away
+            self.hass.async_create_task(self.async_request_refresh())
+        else:
+            # Mark entities unavailable now instead of at the next poll
+            self.async_update_listeners()
+
+    @callback
+    def async_push_cache(self) -> None:
+        """Push the locally updated cache to all entities without any I/O.
+
+        Call it only after a successful write.
+
+        A write that went out means the device is being changed, so poll
+        fast for a while to pick up the actual fan speeds; writes skipped as
+        already set on the device do not. Entities are updated again once
+        the read-back of the written registers completes.
+        """
+        if self._decisions.writes_finished():
+            self._apply_schedule()
+            self._schedule_refresh()
+        self._async_save(self.system.registers)
+        self._async_publish_cache()
+        confirmation = self.system.confirmation
+        if confirmation is not None and confirmation is not self._confirmation:
+            self._confirmation = confirmation
+            confirmation.add_done_callback(self._async_write_confirmed)
+
+    @callback
+    def _async_write_confirmed(self, confirmation: asyncio.Future) -> None:
+        """Publish the read-back values (confirmed or not, the cache now holds the device state)."""
+        if self._confirmation is confirmation:
+            self._confirmation = None
+        if self._shutdown or confirmation.cancelled():
+            return
+        self._async_save(self.system.registers)
+        self._async_publish_cache()
+
+    @callback
+    def _async_publish_cache(self) -> None:
+        """Hand the cache to the entities.
+
+        Unlike async_set_updated_data this leaves last_update_success and
+        the refresh timer alone: a local cache update is not a poll.
+        """
+        self.data = self.system.registers
+        self.async_update_listeners()
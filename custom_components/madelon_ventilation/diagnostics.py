@@ -0,0 +1,65 @@
+"""Diagnostics support for the Madelon Ventilation integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_HOST}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return link metrics, cache state and the last snapshot for a config entry."""
+    data = hass.data[DOMAIN][config_entry.entry_id]
+    system = data["system"]
+    coordinator = data["coordinator"]
+    modbus = system.modbus
+    snapshot = system.registers
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(config_entry.data), TO_REDACT),
+            "options": dict(config_entry.options),
+        },
+        "gateway": {
+            **modbus.metrics.as_dict(),
+            "circuit": modbus.breaker.state.value,
+            "retry_in": round(modbus.breaker.retry_in, 1),
+            "bus": {"queue_depth": modbus.bus.queue_depth, **modbus.bus.metrics.as_dict()},
+            "units": {
+                str(unit_id): metrics.as_dict()
+                for unit_id, metrics in modbus.metrics.units.items()
+            },
+        },
+        "unit": {
+            "unit_id": system.unit_id,
+            "link": system.link_metrics.as_dict(),
+            "cache": system.cache_metrics.as_dict(),
+            "superseded_writes": system.superseded_writes,
+            "sent_writes": system.sent_writes,
+            "suppressed_writes": system.suppressed_writes,
+            "read_back": system.read_back.as_dict(),
+            "read_plan": [[span.start, span.count] for span in system.read_plan],
+            "poll_groups": {
+                group: None if age is None else round(age, 1)
+                for group, age in system.poll_group_ages.items()
+            },
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "is_stale": coordinator.is_stale,
+        },
+        "snapshot": None if snapshot is None else {
+            "version": snapshot.version,
+            "timestamp": snapshot.timestamp,
+            "registers": snapshot.as_dict(),
+        },
+    }
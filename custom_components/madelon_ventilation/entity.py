@@ -0,0 +1,109 @@
+"""Base entity for the Madelon Ventilation integration."""
+from __future__ import annotations
+
+from homeassistant.core import Context, callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import (
+    DOMAIN,
+    DEVICE_MANUFACTURER,
+    DEVICE_MODEL,
+    DEVICE_SW_VERSION,
+)
+from .coordinator import MadelonCoordinator
+from .snapshot import RegisterSnapshot
+from .trace import trace_caller
+
+
+class MadelonEntity(CoordinatorEntity[MadelonCoordinator]):
+    """Entity backed by the shared device coordinator."""
+
+    _attr_has_entity_name = True
+    # Registers this entity reads; registers no entity subscribes to are not polled
+    _registers: tuple[str, ...] = ()
+
+    def __init__(self, coordinator: MadelonCoordinator) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self._system = coordinator.system
+        self._register_mask = self._system.register_mask(self._registers)
+        # What was last written to the state machine
+        self._written_snapshot: RegisterSnapshot | None = None
+        self._written_status: tuple[bool, bool] | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the registers this entity needs."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self._system.subscribe(self._registers))
+        # Adding the entity writes its initial state from this snapshot
+        self._written_snapshot = self.coordinator.data
+        self._status_changed()
+
+    @callback
+    def async_set_context(self, context: Context) -> None:
+        """Tag the Modbus transactions of the service call that follows.
+
+        Home Assistant sets the context right before running the service
+        method in the same task, so the trace sees this entity as the caller.
+        """
+        super().async_set_context(context)
+        trace_caller.set(self.entity_id)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when a register this entity shows has changed."""
+        if not self._has_changed():
+            return
+        super()._handle_coordinator_update()
+
+    def _has_changed(self) -> bool:
+        """Compare the new snapshot with the last written one for this entity."""
+        snapshot = self.coordinator.data
+        previous = self._written_snapshot
+        self._written_snapshot = snapshot
+        if self._status_changed() or snapshot is None or previous is None:
+            return True
+        if snapshot.version == previous.version + 1:
+            changed = snapshot.changed
+        else:
+            changed = snapshot.changed_mask(previous)
+        return bool(changed & self._register_mask)
+
+    def _status_changed(self) -> bool:
+        """Return True when availability or staleness differs from the written state."""
+        status = (self.available, self.coordinator.is_stale)
+        if status == self._written_status:
+            return False
+        self._written_status = status
+        return True
+
+    @property
+    def extra_state_attributes(self) -> dict[str, bool] | None:
+        """Flag values restored from disk until the first live poll."""
+        if self.coordinator.is_stale:
+            return {"stale": True}
+        return None
+
+    @property
+    def available(self) -> bool:
+        """Unavailable while the last poll failed or the gateway circuit is open."""
+        return super().available and self._system.modbus.available
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device information about this entity."""
+        return DeviceInfo(
+            identifiers={(DOMAIN, self._system.unique_identifier)},
+            name="Fresh Air System",
+            manufacturer=DEVICE_MANUFACTURER,
+            model=DEVICE_MODEL,
+            sw_version=DEVICE_SW_VERSION,
+        )
+
+    def _get_value(self, key):
+        """Return a decoded value from the latest coordinator snapshot."""
+        snapshot = self.coordinator.data
+        value = None if snapshot is None else snapshot.values.get(key)
+        self._system.cache_metrics.record_read(None if value is None else snapshot.timestamp)
+        return value
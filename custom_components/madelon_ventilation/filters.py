@@ -0,0 +1,72 @@
+"""Deadband filtering for measurement sensors."""
+from __future__ import annotations
+
+import time
+
+from .const import (
+    CONF_DEADBAND,
+    CONF_HEARTBEAT,
+    CONF_MIN_INTERVAL,
+    DEFAULT_DEADBAND,
+    DEFAULT_HEARTBEAT,
+    DEFAULT_MIN_INTERVAL,
+)
+
+
+def deadband_options(options, sensor: str) -> dict[str, float]:
+    """Return the deadband settings of one sensor from the entry options."""
+    return {
+        "threshold": options.get(f"{sensor}_{CONF_DEADBAND}", DEFAULT_DEADBAND.get(sensor, 0)),
+        "min_interval": options.get(f"{sensor}_{CONF_MIN_INTERVAL}", DEFAULT_MIN_INTERVAL),
+        "heartbeat": options.get(f"{sensor}_{CONF_HEARTBEAT}", DEFAULT_HEARTBEAT),
+    }
+
+
+class DeadbandFilter:
+    """Decide whether a new measurement is worth publishing.
+
+    A value is published when it moved at least ``threshold`` away from the
+    last *published* value (so jitter around a value never accumulates), but
+    not more often than every ``min_interval`` seconds. After ``heartbeat``
+    seconds the current value is published regardless. A zero disables the
+    corresponding rule.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.0,
+        min_interval: float = 0.0,
+        heartbeat: float = 0.0,
+        clock=time.monotonic,
+    ) -> None:
+        self._clock = clock
+        self._last_value = None
+        self._last_time: float | None = None
+        self.configure(threshold, min_interval, heartbeat)
+
+    def configure(self, threshold: float, min_interval: float, heartbeat: float) -> None:
+        """Change the settings, keeping the last published value."""
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+
+    def should_publish(self, value) -> bool:
+        """Return True if ``value`` should be written to the state machine."""
+        if self._last_time is None:
+            return True
+        if value is None or self._last_value is None:
+            return value is not self._last_value
+        elapsed = self._clock() - self._last_time
+        if self.heartbeat and elapsed >= self.heartbeat:
+            return True
+        if elapsed < self.min_interval:
+            return False
+        if self.threshold:
+            # small epsilon so a 0.2 step of 0.1-resolution values counts as 0.2
+            return abs(value - self._last_value) >= self.threshold - 1e-9
+        return value != self._last_value
+
+    def mark_published(self, value) -> None:
+        """Record that ``value`` was written."""
+        self._last_value = value
+        self._last_time = self._clock()
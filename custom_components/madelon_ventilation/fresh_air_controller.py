@@ -1,14 +1,43 @@
 from enum import Enum
-from pymodbus.client import ModbusTcpClient
+from pymodbus.client import AsyncModbusTcpClient
 from pymodbus import (
     ExceptionResponse,
     ModbusException,
     # pymodbus_apply_logging_config,
 )
+from pymodbus.exceptions import ModbusIOException
 import logging
-from .const import DEFAULT_PORT, DEFAULT_UNIT_ID
+from .const import (
+    CONFIRM_RETRY_DELAYS,
+    POLL_GROUP_INTERVALS,
+    WRITE_CONFIDENCE_WINDOWS,
+    DEFAULT_GAP_COST,
+    DEFAULT_PORT,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_UNIT_ID,
+    MAX_READ_REGISTERS,
+    TRACE_BUFFER_SIZE,
+)
+from .bus import BusScheduler, Priority
+from .circuit_breaker import CircuitBreaker, CircuitState
+from .clock import SYSTEM_CLOCK
+from .coalescer import CommandCoalescer
+from .capture import CaptureWriter
+from .metrics import CacheMetrics, GatewayMetrics
+from .trace import (
+    RESULT_ERROR,
+    RESULT_EXCEPTION,
+    RESULT_OK,
+    RESULT_REJECTED,
+    RESULT_TIMEOUT,
+    TraceBuffer,
+    trace_caller,
+)
+from .planner import plan_reads, spans_for
+from .readback import ReadBackConfirmer
+from .schema import RegisterField, RegisterSchema, register_properties
+from .snapshot import RegisterSnapshot, address_mask
 import asyncio
-import time
 
 # Enable logging
 logging.basicConfig()
@@ -17,84 +46,300 @@ log.setLevel(logging.WARNING)
 
 
 class ModbusClient:
-    def __init__(self, host, port=DEFAULT_PORT, unit_id=DEFAULT_UNIT_ID):
+    def __init__(self, host, port=DEFAULT_PORT, unit_id=DEFAULT_UNIT_ID, clock=SYSTEM_CLOCK):
         self.host = host
         self.port = port
         self.unit_id = unit_id
         self.client = None
         self.logger = logging.getLogger(__name__)
-        self.retry_count = 3
-        self.retry_delay = 1  # seconds
         self.connection_timeout = 10  # 连接超时时间（秒）
+        self.request_timeout = 3  # 单次请求超时时间（秒）
+        self.request_retries = 0  # pymodbus 不自动重发，重试由断路器负责
+        self.bus = BusScheduler(clock=clock)  # 按优先级串行化总线访问
+        self._clock = clock
+        self.breaker = CircuitBreaker(clock=clock.monotonic)
+        self._probe_task = None
+        self._state_listeners = []
+        self.metrics = GatewayMetrics()
+        self.trace = TraceBuffer(TRACE_BUFFER_SIZE)
+        self.capture = None  # CaptureWriter while capture mode is on
 
-    def _ensure_connected(self):
-        """Ensure connection is established with retry mechanism"""
-        start_time = time.time()
-        for attempt in range(self.retry_count):
-            try:
-                if time.time() - start_time > self.connection_timeout:
-                    self.logger.error("Connection timeout")
-                    return False
-                    
-                if self.client is None:
-                    self.client = ModbusTcpClient(host=self.host, port=self.port)
-                if not self.client.connected:
-                    self.client.connect()
+    @property
+    def available(self):
+        """网关连接是否可用（断路器闭合）"""
+        return self.breaker.state is CircuitState.CLOSED
+
+    def add_state_listener(self, listener):
+        """注册连接可用性变化的回调，返回取消注册的函数"""
+        self._state_listeners.append(listener)
+        return lambda: self._state_listeners.remove(listener)
+
+    def _set_breaker_result(self, success, trip=False):
+        """记录网关级的请求结果，必要时启动后台探测并通知监听者
+
+        trip: 立即打开断路器（所有单元都不应答）
+        """
+        was_available = self.available
+        if success:
+            self.breaker.record_success()
+        else:
+            if trip:
+                self.breaker.trip()
+            else:
+                self.breaker.record_failure()
+            if self.client is not None:
+                # 丢弃可能已半开的 socket，下次重新建立连接
+                self.client.close()
+                self.client = None
+        if self.breaker.state is CircuitState.OPEN:
+            self._schedule_probe()
+        if was_available != self.available:
+            self.logger.warning(
+                f"Gateway {self.host}:{self.port} "
+                f"{'available again' if self.available else 'unavailable, failing fast'}"
+            )
+            for listener in list(self._state_listeners):
+                listener(self.available)
+
+    def _schedule_probe(self):
+        """在后台按退避时间探测网关，恢复后闭合断路器"""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe())
+
+    async def _probe(self):
+        trace_caller.set("probe")
+        while self.breaker.state is CircuitState.OPEN:
+            await asyncio.sleep(self.breaker.retry_in)
+            async with self.bus.slot(Priority.BACKGROUND):
+                if not self.breaker.allow_request():
+                    continue
+                healthy = await self._ensure_connected() and await self._probe_read()
+            self._set_breaker_result(healthy)
+
+    async def _probe_read(self):
+        """读一个寄存器确认总线上有单元应答（网关可能接受 TCP 连接但 RS485 总线已断）"""
+        units = self.metrics.units
+        unit_id = min(units, key=lambda unit: units[unit].consecutive_timeouts, default=self.unit_id)
+        metrics = self.metrics.unit(unit_id)
+        kwargs = {'address': 0, 'count': 1}
+        sent = self._request_size('read_holding_registers', kwargs)
+        started = self._clock.monotonic()
+        try:
+            response = await self.client.read_holding_registers(slave=unit_id, **kwargs)
+        except ModbusIOException as e:
+            self.logger.debug(f"Probe read of unit {unit_id} got no reply: {e}")
+            metrics.record_timeout(sent)
+            self._trace(started, self._clock.monotonic(), unit_id, 'read_holding_registers', kwargs, RESULT_TIMEOUT)
+            return False
+        except Exception as e:
+            self.logger.debug(f"Probe read of unit {unit_id} failed: {e}")
+            metrics.record_error()
+            self._trace(started, self._clock.monotonic(), unit_id, 'read_holding_registers', kwargs, RESULT_ERROR)
+            return False
+        ended = self._clock.monotonic()
+        # 异常应答也说明总线和单元在工作
+        exception = isinstance(response, ExceptionResponse) or response.isError()
+        metrics.record_response(
+            ended - started, sent, self._response_size('read_holding_registers', kwargs, exception), exception
+        )
+        self._trace(
+            started, ended, unit_id, 'read_holding_registers', kwargs,
+            RESULT_EXCEPTION if exception else RESULT_OK, response,
+        )
+        return True
+
+    def _record_no_reply(self):
+        """某个单元没有应答：只在网关上所有单元都连续不应答时才算网关故障
+
+        单个单元断电或地址配置错误不应让同一网关上正常的单元也快速失败。
+        半开状态下的请求没有应答则直接重新打开断路器。
+        """
+        if self.breaker.state is CircuitState.HALF_OPEN:
+            # 半开状态下放行的请求没有应答：重新打开断路器，由后台探测继续退避重试
+            self._set_breaker_result(False)
+            return
+        threshold = self.breaker.failure_threshold
+        if all(unit.consecutive_timeouts >= threshold for unit in self.metrics.units.values()):
+            self.logger.warning(f"No unit on gateway {self.host}:{self.port} is answering")
+            self._set_breaker_result(False, trip=True)
+
+    async def _ensure_connected(self):
+        """Ensure connection is established (single attempt, backoff is handled by the breaker)"""
+        try:
+            if self.client is None:
+                self.client = self._create_client()
+            if self.client.connected:
                 return True
-            except ConnectionRefusedError as e:
-                self.logger.error(f"Connection refused: {e}")
-            except TimeoutError as e:
-                self.logger.error(f"Connection timeout: {e}")
-            except ConnectionError as e:
-                self.logger.error(f"Connection error: {e}")
-            except Exception as e:
-                self.logger.error(f"Unexpected error: {e}")
-                raise
-                
-            if attempt < self.retry_count - 1:
-                time.sleep(self.retry_delay)
+            if await asyncio.wait_for(self.client.connect(), self.connection_timeout):
+                self.metrics.connects += 1
+                return True
+            self.logger.error(f"Unable to connect to {self.host}:{self.port}")
+        except ConnectionRefusedError as e:
+            self.logger.error(f"Connection refused: {e}")
+        except (TimeoutError, asyncio.TimeoutError) as e:
+            self.logger.error(f"Connection timeout: {e}")
+        except ConnectionError as e:
+            self.logger.error(f"Connection error: {e}")
+        self.metrics.connect_failures += 1
         return False
 
-    def read_registers(self, start_address, count):
-        """Read multiple holding registers."""
-        try:
-            if not self._ensure_connected():
+    def _create_client(self):
+        """创建底层 pymodbus 客户端（模拟环境可替换为内存传输）"""
+        # reconnect_delay=0 关闭 pymodbus 自带的后台重连，由断路器统一处理
+        return AsyncModbusTcpClient(
+            host=self.host,
+            port=self.port,
+            timeout=self.request_timeout,
+            retries=self.request_retries,
+            reconnect_delay=0,
+        )
+
+    # MBAP 头（7 字节）+ PDU 的长度，用于统计线路上的字节数
+    @staticmethod
+    def _request_size(method, kwargs):
+        if method == 'write_registers':
+            return 7 + 6 + 2 * len(kwargs['values'])
+        return 7 + 5
+
+    @staticmethod
+    def _response_size(method, kwargs, exception):
+        if exception:
+            return 7 + 2
+        if method == 'read_holding_registers':
+            return 7 + 2 + 2 * kwargs['count']
+        return 7 + 5
+
+    async def _execute(self, method, unit_id=None, priority=Priority.POLL, **kwargs):
+        """占用一个总线时隙执行一次 Modbus 事务，失败时返回 None
+
+        同一网关上的所有单元共享这个连接，BusScheduler 保证 RS485 总线上同一时间只有一个请求，
+        并让用户写入排在已排队的轮询之前。断路器打开时直接返回 None，不等待网络。
+        """
+        unit_id = self.unit_id if unit_id is None else unit_id
+        if self.breaker.rejecting:
+            now = self._clock.monotonic()
+            self._trace(now, now, unit_id, method, kwargs, RESULT_REJECTED)
+            return None
+        metrics = self.metrics.unit(unit_id)
+        sent = self._request_size(method, kwargs)
+        async with self.bus.slot(priority):
+            started = self._clock.monotonic()
+            # 排队期间断路器可能已经打开
+            if not self.breaker.allow_request():
+                self._trace(started, started, unit_id, method, kwargs, RESULT_REJECTED)
                 return None
-            response = self.client.read_holding_registers(
-                address=start_address,
-                count=count,
-                slave=self.unit_id
-            )
-            if isinstance(response, ExceptionResponse):
-                self.logger.error(f"Error reading registers: {response}")
+            try:
+                if not await self._ensure_connected():
+                    metrics.record_error()
+                    self._trace(started, self._clock.monotonic(), unit_id, method, kwargs, RESULT_ERROR)
+                    self._set_breaker_result(False)
+                    return None
+                started = self._clock.monotonic()
+                response = await getattr(self.client, method)(slave=unit_id, **kwargs)
+                ended = self._clock.monotonic()
+            except ModbusIOException as e:
+                # pymodbus 在没有应答（超时）时抛出 ModbusIOException；连接本身仍可用
+                self.logger.error(f"Error in {method} for unit {unit_id}: {e}")
+                metrics.record_timeout(sent)
+                self._trace(started, self._clock.monotonic(), unit_id, method, kwargs, RESULT_TIMEOUT)
+                self._record_no_reply()
                 return None
-            return response
-        except Exception as e:
-            self.logger.error(f"Error reading registers: {e}")
+            except ModbusException as e:
+                self.logger.error(f"Error in {method}: {e}")
+                metrics.record_error()
+                self._trace(started, self._clock.monotonic(), unit_id, method, kwargs, RESULT_ERROR)
+                self._set_breaker_result(False)
+                return None
+            except Exception as e:
+                self.logger.error(f"Error in {method}: {e}")
+                metrics.record_error()
+                self._trace(started, self._clock.monotonic(), unit_id, method, kwargs, RESULT_ERROR)
+                self._set_breaker_result(False)
+                return None
+        # 设备返回了应答（即使是异常应答），说明链路正常
+        self._set_breaker_result(True)
+        exception = isinstance(response, ExceptionResponse) or response.isError()
+        metrics.record_response(ended - started, sent, self._response_size(method, kwargs, exception), exception)
+        self._trace(started, ended, unit_id, method, kwargs, RESULT_EXCEPTION if exception else RESULT_OK, response)
+        if exception:
+            self.logger.error(f"Error in {method}: {response}")
             return None
+        return response
+
+    # 方法名对应的功能码
+    FUNCTION_CODES = {
+        'read_holding_registers': 3,
+        'write_register': 6,
+        'write_registers': 16,
+    }
 
-    def write_single_register(self, address, value):
+    def _trace(self, start, end, unit_id, method, kwargs, result, response=None):
+        """把一次事务写入环形缓冲区，录制模式下同时写入录制文件"""
+        if 'values' in kwargs:
+            count = len(kwargs['values'])
+        else:
+            count = kwargs.get('count', 1)
+        function = self.FUNCTION_CODES[method]
+        self.trace.record(
+            start, end, unit_id, function, kwargs['address'],
+            count, result, trace_caller.get(),
+        )
+        if self.capture is None or result == RESULT_REJECTED:
+            return
+        if method == 'read_holding_registers':
+            registers = response.registers if result == RESULT_OK else ()
+        else:
+            registers = kwargs['values'] if 'values' in kwargs else (kwargs['value'],)
+        self.capture.record(
+            start, end, unit_id, function, result, kwargs['address'], count, registers,
+            response.exception_code if result == RESULT_EXCEPTION else None,
+        )
+
+    async def start_capture(self, path):
+        """开始把请求/应答及时间录制到二进制文件（见 capture.py）"""
+        await self.stop_capture()
+        capture = CaptureWriter(path, clock=self._clock.monotonic)
+        await capture.async_open()
+        self.capture = capture
+        self.logger.info(f"Capturing {self.host}:{self.port} traffic to {path}")
+
+    async def stop_capture(self):
+        """结束录制，返回写入的记录数（未在录制时返回 None）"""
+        capture, self.capture = self.capture, None
+        if capture is None:
+            return None
+        await capture.async_close()
+        return capture.records
+
+    async def read_registers(self, start_address, count, unit_id=None, priority=Priority.POLL):
+        """Read multiple holding registers."""
+        return await self._execute(
+            'read_holding_registers', unit_id, priority, address=start_address, count=count
+        )
+
+    async def write_single_register(self, address, value, unit_id=None, priority=Priority.INTERACTIVE):
         """Write a single register."""
-        try:
-            if not self._ensure_connected():
-                return False
-            response = self.client.write_register(
-                address=address,
-                value=value,
-                slave=self.unit_id
-            )
-            if isinstance(response, ExceptionResponse):
-                self.logger.error(f"Error writing register: {response}")
-                return False
-            return True
-        except Exception as e:
-            self.logger.error(f"Error writing register: {e}")
-            return False
+        response = await self._execute('write_register', unit_id, priority, address=address, value=value)
+        return response is not None
+
+    async def write_registers(self, address, values, unit_id=None, priority=Priority.INTERACTIVE):
+        """Write multiple contiguous registers (FC16)."""
+        response = await self._execute(
+            'write_registers', unit_id, priority, address=address, values=list(values)
+        )
+        return response is not None
 
     def close(self):
         """显式关闭连接"""
-        if self.client and self.client.connected:
+        if self.capture is not None:
+            # 文件在后台写完并关闭
+            asyncio.get_running_loop().create_task(self.stop_capture())
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+        if self.client is not None:
             self.client.close()
+            self.client = None
 
 
 __all__ = ['FreshAirSystem', 'OperationMode']
@@ -117,88 +362,375 @@ class OperationMode(Enum):
             return cls.MANUAL
 
 
+# 风速寄存器原始值 -> 名称
+SPEED_NAMES = {1: "low", 2: "medium", 3: "high"}
+
+
+@register_properties
 class FreshAirSystem:
-    """新风系统控制类"""
-
-    # 寄存器地址映射
-    REGISTERS = {
-        'power': 0,        # 电源控制
-        'mode': 4,         # 运行模式
-        'supply_speed': 7,  # 送风速度设置
-        'exhaust_speed': 8,  # 排风速度设置
-        'bypass': 9,       # 旁通开关
-        'actual_supply': 12,  # 实际送风速度
-        'actual_exhaust': 13,  # 实际排风速度
-        'temperature': 16,  # 温度
-        'humidity': 17,    # 湿度
+    """新风系统控制类
+
+    状态属性（power、mode、temperature 等）由 SCHEMA 生成，读取安装快照时已解码的值。
+    """
+
+    # 寄存器表：地址、分组、解码方式和传感器实体都在这里声明，新增寄存器只需添加一行
+    SCHEMA = RegisterSchema((
+        RegisterField('power', 0, boolean=True, doc="获取电源状态"),
+        RegisterField(
+            'mode', 4, enum={0: OperationMode.MANUAL, 1: OperationMode.AUTO, 2: OperationMode.TIMER},
+            default=OperationMode.MANUAL, doc="获取运行模式",
+        ),
+        RegisterField(
+            'supply_speed', 7, enum=SPEED_NAMES, device_class="enum",
+            entity_name="SupplyFan", unique_id="SupplySpeed", doc="送风速度设置（low/medium/high）",
+        ),
+        RegisterField(
+            'exhaust_speed', 8, enum=SPEED_NAMES, device_class="enum",
+            entity_name="ExhaustFan", unique_id="ExhaustSpeed", doc="排风速度设置（low/medium/high）",
+        ),
+        RegisterField('bypass', 9, boolean=True, doc="获取旁通状态"),
+        RegisterField('actual_supply', 12, key='actual_supply_speed', doc="获取实际送风速度"),
+        RegisterField('actual_exhaust', 13, key='actual_exhaust_speed', doc="获取实际排风速度"),
+        RegisterField(
+            'temperature', 16, group='telemetry', signed=True, scale=0.1, precision=1,
+            unit="°C", device_class="temperature", entity_name="Temperature", doc="获取温度（°C）",
+        ),
+        RegisterField(
+            'humidity', 17, group='telemetry', scale=0.1, precision=1,
+            unit="%", device_class="humidity", entity_name="Humidity", doc="获取湿度（%）",
+        ),
+    ), groups=POLL_GROUP_INTERVALS)
+
+    # 寄存器名 -> 地址
+    REGISTERS = SCHEMA.registers
+    # 轮询分组，各组的读取间隔见 POLL_GROUP_INTERVALS（static: 固件/型号/滤网时间等，地址尚未映射）
+    REGISTER_GROUPS = SCHEMA.groups
+
+    # 写入后一并读回的反馈寄存器：设定值 -> 设备随之改变的寄存器
+    FEEDBACK = {
+        'power': ('actual_supply', 'actual_exhaust'),
+        'mode': ('supply_speed', 'exhaust_speed', 'bypass'),  # AUTO 模式由设备决定风速和旁通
+        'supply_speed': ('actual_supply',),
+        'exhaust_speed': ('actual_exhaust',),
     }
 
-    def __init__(self, host, port=DEFAULT_PORT, unit_id=DEFAULT_UNIT_ID):
-        self.modbus = ModbusClient(host=host, port=port, unit_id=unit_id)
-        self._registers_cache = None
-        self.unique_identifier = f"{host}:{port}"  # Use host and port as a unique identifier
+    def __init__(self, host, port=DEFAULT_PORT, unit_id=DEFAULT_UNIT_ID,
+                 gap_cost=DEFAULT_GAP_COST, max_read_count=MAX_READ_REGISTERS,
+                 modbus=None, clock=SYSTEM_CLOCK,
+                 confidence_windows=None, confirm_delays=CONFIRM_RETRY_DELAYS,
+                 poll_intervals=None, scan_interval=DEFAULT_SCAN_INTERVAL):
+        # modbus: 可传入同一网关共享的 ModbusClient（见 hub.py）
+        # scan_interval: 配置的轮询间隔（秒），缓存有效期跟随它（见 set_cache_ttl）
+        self.modbus = modbus or ModbusClient(host=host, port=port, unit_id=unit_id, clock=clock)
+        self.modbus.metrics.unit(unit_id)  # 登记本单元，网关故障判断需要知道所有单元
+        self._clock = clock
+        self.unit_id = unit_id
+        self._registers_cache = None  # RegisterSnapshot
+        self._snapshot_version = 0
+        self._gap_cost = gap_cost
+        self._max_read_count = max_read_count
+        self._subscriptions = {}  # {寄存器名: 订阅计数}
+        self._group_plans = {}  # {frozenset(组名): 读取区间}
+        self._poll_intervals = {**POLL_GROUP_INTERVALS, **(poll_intervals or {})}
+        self._group_read_at = {}  # {组名: 最近一次读取成功的开始时间 (monotonic)}
+        # 每次轮询都读取的地址，所在区间用 POLL 优先级，其余区间用 BACKGROUND
+        self._every_poll_addresses = {
+            self.REGISTERS[name]
+            for group, names in self.REGISTER_GROUPS.items()
+            if not self._poll_intervals.get(group, 0)
+            for name in names
+        }
+        # Use host and port as a unique identifier, plus the unit ID for extra units on the same gateway
+        self.unique_identifier = f"{host}:{port}"
+        if unit_id != DEFAULT_UNIT_ID:
+            self.unique_identifier = f"{host}:{port}:{unit_id}"
         self.logger = logging.getLogger(__name__)
         self.logger.debug(f"Initialized FreshAirSystem with host: {host}, port: {port}")
-        self.sensors = []  # List to hold sensor entities
         self._cache_timestamp = None
-        self._cache_ttl = 30  # 缓存有效期（秒）
-        self._is_reading = False  # 添加读取锁
+        self._cache_ttl = scan_interval  # 缓存有效期（秒）
+        self._inflight_read = None  # 正在进行的读取任务
+        self._writes_during_read = None  # 读取期间写入的值 {地址: 值}
+        self.cache_metrics = CacheMetrics(clock=clock.time)
+        # 短时间内对同一寄存器的多次写入只保留最后一次
+        self._coalescer = CommandCoalescer(self._write_now)
+        # 写入值与可信的缓存值相同时跳过写入，{寄存器名: 可信秒数}
+        self._confidence_windows = dict(
+            WRITE_CONFIDENCE_WINDOWS if confidence_windows is None else confidence_windows
+        )
+        self._confirmed_at = {}  # {地址: 最近一次从设备读到或写入成功的时间 (monotonic)}
+        self._forced_writes = set()  # 要求强制写入、尚未发送的寄存器名
+        self.suppressed_writes = 0  # 因此省下的写请求数
+        self.sent_writes = 0  # 实际发送的写请求数
+        # 写入成功后只读回相关寄存器确认，不触发全量轮询
+        self.read_back = ReadBackConfirmer(self._async_read_back, confirm_delays)
+
+    def subscribe(self, register_names):
+        """登记实体需要的寄存器，返回取消订阅的回调
+
+        只有被订阅的寄存器才会被读取；没有任何订阅时读取全部寄存器。
+        """
+        register_names = tuple(register_names)
+        for name in register_names:
+            if name not in self.REGISTERS:
+                raise KeyError(f"Unknown register: {name}")
+            self._subscriptions[name] = self._subscriptions.get(name, 0) + 1
+        self._group_plans.clear()
+
+        def unsubscribe():
+            for name in register_names:
+                remaining = self._subscriptions.get(name, 0) - 1
+                if remaining > 0:
+                    self._subscriptions[name] = remaining
+                else:
+                    self._subscriptions.pop(name, None)
+            self._group_plans.clear()
+
+        return unsubscribe
+
+    @property
+    def read_plan(self):
+        """读取全部分组所需的 FC03 读取区间列表"""
+        return self.plan_for(self.REGISTER_GROUPS)
+
+    def plan_for(self, groups):
+        """读取指定分组中被订阅的寄存器所需的区间，同时到期的组合并规划"""
+        key = frozenset(groups)
+        plan = self._group_plans.get(key)
+        if plan is None:
+            names = self._subscriptions or self.REGISTERS
+            plan = self._group_plans[key] = plan_reads(
+                (
+                    self.REGISTERS[name]
+                    for group in key
+                    for name in self.REGISTER_GROUPS[group]
+                    if name in names
+                ),
+                gap_cost=self._gap_cost,
+                max_count=self._max_read_count,
+            )
+            self.logger.debug(f"Read plan for {sorted(key)}: {plan}")
+        return plan
+
+    def due_groups(self):
+        """到期需要读取的分组"""
+        now = self._clock.monotonic()
+        return tuple(
+            group for group in self.REGISTER_GROUPS
+            if group not in self._group_read_at
+            or now - self._group_read_at[group] >= self._poll_intervals.get(group, 0)
+        )
+
+    @property
+    def poll_group_ages(self):
+        """{组名: 距上次读取的秒数}，尚未读取时为 None"""
+        now = self._clock.monotonic()
+        return {
+            group: None if group not in self._group_read_at else now - self._group_read_at[group]
+            for group in self.REGISTER_GROUPS
+        }
+
+    def spans_for(self, register_names):
+        """返回读取指定寄存器所需的区间"""
+        return spans_for(self.read_plan, (self.REGISTERS[name] for name in register_names))
 
-    def register_sensor(self, sensor):
-        """Register a sensor entity with the system."""
-        self.sensors.append(sensor)
+    @property
+    def clock(self):
+        """时间来源（见 clock.py），调度器等应使用同一个"""
+        return self._clock
+
+    def set_cache_ttl(self, seconds):
+        """设置缓存有效期（秒），跟随轮询间隔；写入可信窗口也不超过它"""
+        self._cache_ttl = seconds
 
     def _is_cache_valid(self):
         """检查缓存是否有效"""
         if self._cache_timestamp is None or self._registers_cache is None:
             return False
-        return (time.time() - self._cache_timestamp) < self._cache_ttl
+        return (self._clock.time() - self._cache_timestamp) < self._cache_ttl
 
-    def _read_all_registers(self, force_refresh=False):
+    async def async_read_all_registers(self, force_refresh=False):
         """一次性读取所有相关寄存器"""
         if not force_refresh and self._is_cache_valid():
             return True
-            
-        # 防止重复读取
-        if self._is_reading:
-            self.logger.debug("Already reading registers, skipping duplicate read")
+        return await self._async_read(tuple(self.REGISTER_GROUPS))
+
+    async def async_poll(self):
+        """读取到期的分组；同时到期的组合并为一组区间读取"""
+        groups = self.due_groups()
+        if not groups:
             return True
+        return await self._async_read(groups)
+
+    async def _async_read(self, groups):
+        """同一时间只有一个读取在进行（single-flight）
+
+        并发调用者等待同一个读取任务并得到同一个结果，而不是提前返回旧缓存。
+        """
+        task = self._inflight_read
+        if task is None:
+            self.logger.debug(f"Starting register read of {groups}")
+            task = asyncio.get_running_loop().create_task(self._async_read_spans(groups))
+            self._inflight_read = task
+            self._writes_during_read = {}
+            task.add_done_callback(self._finish_read)
+        else:
+            self.logger.debug("Register read already in flight, waiting for it")
+        # shield: 某个调用者被取消时不影响其他等待者
+        return await asyncio.shield(task)
 
+    def close(self):
+        """停止进行中的读取和未发送的写入并注销本单元；共享的 ModbusClient 由 ModbusHub 负责关闭"""
+        self._coalescer.close()
+        self.read_back.close()
+        if self._inflight_read is not None:
+            self._inflight_read.cancel()
+            self._inflight_read = None
+            self._writes_during_read = None
+        self._subscriptions.clear()
+        self._group_plans.clear()
+        self._group_read_at.clear()
+        self._confirmed_at.clear()
+        self._forced_writes.clear()
+        # 其超时计数不应再影响网关故障判断和探测单元的选择
+        self.modbus.metrics.remove_unit(self.unit_id)
+
+    def _finish_read(self, task):
+        if self._inflight_read is task:
+            self._inflight_read = None
+            self._writes_during_read = None
+
+    async def _async_read_spans(self, groups):
+        """读取分组的全部区间，成功后合并进缓存生成新快照"""
         try:
-            self._is_reading = True
-            start_address = min(self.REGISTERS.values())
-            count = max(self.REGISTERS.values()) - start_address + 1
-            self.logger.debug(f"Reading all registers from {start_address} to {start_address + count - 1}")
-            response = self.modbus.read_registers(start_address, count)
-            if response and hasattr(response, 'registers'):
-                self._registers_cache = response.registers
-                self._cache_timestamp = time.time()
-                self.logger.debug(f"Registers read: {self._registers_cache}")
-
-                # Update all registered sensors
-                for sensor in self.sensors:
-                    sensor.schedule_update_ha_state(True)
-                return True
-            return False
+            started = self._clock.monotonic()
+            registers = {}
+            for span in self.plan_for(groups):
+                self.logger.debug(f"Reading registers from {span.start} to {span.end}")
+                # 只含慢速分组的区间让位给常规轮询
+                priority = Priority.POLL if any(
+                    address in span for address in self._every_poll_addresses
+                ) else Priority.BACKGROUND
+                response = await self.modbus.read_registers(
+                    span.start, span.count, unit_id=self.unit_id, priority=priority
+                )
+                if not response or not hasattr(response, 'registers'):
+                    return False
+                registers.update(zip(range(span.start, span.end + 1), response.registers))
+            # 读取期间写入成功的值比读到的值更新；但读到的值与之不同时不再据此跳过写入
+            written = self._writes_during_read or {}
+            for address, value in registers.items():
+                if address not in written:
+                    self._confirmed_at[address] = started
+                elif written[address] != value:
+                    self._confirmed_at.pop(address, None)
+            registers.update(written)
+            cached = {} if self._registers_cache is None else self._registers_cache.as_dict()
+            self._install_registers({**cached, **registers})
+            self._group_read_at.update(dict.fromkeys(groups, started))
+            self.logger.debug(f"Registers read: {self._registers_cache}")
+            return True
         except Exception as e:
             self.logger.error(f"Error reading registers: {e}")
             self._registers_cache = None
+            self._confirmed_at.clear()
+            self._group_read_at.clear()
             return False
-        finally:
-            self._is_reading = False
-
-    def _get_register_value(self, register_name):
-        """获取寄存器值"""
-        if self._registers_cache is None:
-            if not self._read_all_registers():
-                return None
 
-        if self._registers_cache is None:
+    async def _async_read_back(self, addresses):
+        """读取指定地址（CONFIRM 优先级），合并进缓存并返回 {地址: 值}，失败返回 None"""
+        try:
+            started = self._clock.monotonic()
+            registers = {}
+            for span in plan_reads(addresses, gap_cost=self._gap_cost, max_count=self._max_read_count):
+                response = await self.modbus.read_registers(
+                    span.start, span.count, unit_id=self.unit_id, priority=Priority.CONFIRM
+                )
+                if not response or not hasattr(response, 'registers'):
+                    return None
+                registers.update(zip(range(span.start, span.end + 1), response.registers))
+        except Exception as e:
+            self.logger.error(f"Error reading back registers: {e}")
             return None
+        # 读取期间又写入成功的地址以写入值为准
+        fresh = {
+            address: value for address, value in registers.items()
+            if self._confirmed_at.get(address, started) <= started
+        }
+        self._confirmed_at.update(dict.fromkeys(fresh, started))
+        cached = {} if self._registers_cache is None else self._registers_cache.as_dict()
+        for address, value in registers.items():
+            # 读取期间写入的值与读到的不同，等确认后才可信
+            if address not in fresh and cached.get(address) != value:
+                self._confirmed_at.pop(address, None)
+        if self._writes_during_read is not None:
+            self._writes_during_read.update(fresh)
+        self._install_registers({**cached, **fresh})
+        self.logger.debug(f"Read back {fresh}")
+        return registers
+
+    def confirm(self, raw_values):
+        """读回 {寄存器名: 原始值} 及其反馈寄存器，返回确认结果的 future (bool)"""
+        related = {
+            self.REGISTERS[feedback]
+            for name in raw_values
+            for feedback in self.FEEDBACK.get(name, ())
+        }
+        return self.read_back.confirm(
+            {self.REGISTERS[name]: raw for name, raw in raw_values.items()}, related
+        )
+
+    @property
+    def confirmation(self):
+        """进行中的写入确认 future，没有时为 None"""
+        return self.read_back.pending
+
+    def _get_decoded(self, key):
+        """获取已解码的状态值（仅读缓存，不产生 I/O）"""
+        snapshot = self._registers_cache
+        value = None if snapshot is None else snapshot.values.get(key)
+        self.cache_metrics.record_read(None if value is None else snapshot.timestamp)
+        return value
+
+    @property
+    def link_metrics(self):
+        """本单元在共享网关连接上的事务统计（UnitMetrics）"""
+        return self.modbus.metrics.unit(self.unit_id)
+
+    @property
+    def registers(self):
+        """当前的不可变寄存器快照（RegisterSnapshot），尚未读取时为 None"""
+        return self._registers_cache
+
+    def _install_registers(self, registers, timestamp=None):
+        """用 {地址: 值} 生成新版本的快照并整体替换缓存"""
+        self._snapshot_version += 1
+        self._registers_cache = RegisterSnapshot.build(
+            registers,
+            version=self._snapshot_version,
+            timestamp=self._clock.time() if timestamp is None else timestamp,
+            previous=self._registers_cache,
+            values=self.decode(registers.get),
+        )
+        self._cache_timestamp = self._registers_cache.timestamp
 
-        register_address = self.REGISTERS[register_name]
-        start_address = min(self.REGISTERS.values())
-        return self._registers_cache[register_address - start_address]
+    def restore_registers(self, registers, timestamp):
+        """载入上次保存的寄存器值（时间戳保持原值，缓存视为过期）"""
+        self._install_registers(registers, timestamp)
+        self.logger.debug(f"Restored registers from {timestamp}: {self._registers_cache}")
+
+    def decode(self, get):
+        """用取值函数 get(地址) 解码全部状态，返回 {名称: 值}"""
+        return self.SCHEMA.decode(get)
+
+    def register_mask(self, register_names):
+        """返回寄存器名对应的地址位掩码，用于和 RegisterSnapshot.changed 比较"""
+        return address_mask(self.REGISTERS[name] for name in register_names)
+
+    def snapshot(self):
+        """返回当前缓存解码后的全部状态（不产生 I/O）"""
+        if self._registers_cache is None:
+            return self.decode(lambda address: None)
+        return dict(self._registers_cache.values)
 
     def _validate_speed(self, speed):
         """Validate speed value (1-3)."""
@@ -223,60 +755,130 @@ class FreshAirSystem:
 
     def _update_cache_value(self, register_name, value):
         """更新缓存中的值"""
+        address = self.REGISTERS[register_name]
+        if self._writes_during_read is not None:
+            self._writes_during_read[address] = value
         if self._registers_cache is not None:
-            register_address = self.REGISTERS[register_name]
-            start_address = min(self.REGISTERS.values())
-            self._registers_cache[register_address - start_address] = value
+            # 生成新快照整体替换，读者拿到的旧快照不会被修改
+            self._install_registers({**self._registers_cache.as_dict(), address: value})
             self.logger.debug(f"Updated cache for {register_name}: {value}")
 
-    @property
-    def power(self):
-        """获取电源状态"""
-        value = self._get_register_value('power')
-        return bool(value) if value is not None else None
+    def _encode_value(self, register_name, value):
+        """把写入值转换为寄存器原始值"""
+        if register_name not in self.REGISTERS:
+            raise KeyError(f"Unknown register: {register_name}")
+        if register_name in ('supply_speed', 'exhaust_speed'):
+            return self._validate_speed(value)
+        if isinstance(value, OperationMode):
+            return self._convert_mode_string(value)
+        return int(value)
+
+    async def apply(self, values, force=False):
+        """批量写入多个寄存器
+
+        空闲时立即写入；前一批写入进行中到达的写入经 CommandCoalescer 合并，同一寄存器只写最后的值（后写者胜）。
+        发送前跳过与可信缓存值相同的寄存器（见 WRITE_CONFIDENCE_WINDOWS）。
+        地址相邻的寄存器合并为一个 FC16 (write_registers) 请求，
+        不相邻的寄存器单独用 FC06 写入。每个请求成功后更新缓存。
+
+        Args:
+            values: {寄存器名: 值}，例如 {'power': 1, 'supply_speed': 2}
+            force: 即使缓存值相同也写入
+
+        Returns:
+            写入（或取代它的更新写入）全部成功，或无需写入时返回 True。
+            设备确认（读回）的结果见 confirmation。
+        """
+        # 先编码校验，无效值不会进入合并批次
+        raw = {name: self._encode_value(name, value) for name, value in values.items()}
+        if force:
+            self._forced_writes.update(raw)
+        return await self._coalescer.submit(raw)
 
-    @power.setter
-    def power(self, state: bool):
+    @property
+    def superseded_writes(self):
+        """被更新的值取代、没有发送的写入次数"""
+        return self._coalescer.superseded
+
+    def _is_confirmed(self, register_name, raw):
+        """设备上的值在可信窗口内已确认等于 raw"""
+        window = self._confidence_windows.get(register_name)
+        address = self.REGISTERS[register_name]
+        confirmed_at = self._confirmed_at.get(address)
+        if not window or confirmed_at is None or self._registers_cache is None:
+            return False
+        if self._registers_cache.get(address) != raw:
+            return False
+        return self._clock.monotonic() - confirmed_at < min(window, self._cache_ttl)
+
+    @staticmethod
+    def _group_runs(writes):
+        """把按地址排序的 (地址, 寄存器名, 值) 按地址连续性分组"""
+        runs = []
+        for write in writes:
+            if runs and write[0] == runs[-1][-1][0] + 1:
+                runs[-1].append(write)
+            else:
+                runs.append([write])
+        return runs
+
+    async def _write_now(self, raw_values):
+        """把 {寄存器名: 原始值} 按地址分组写入，跳过设备上已是该值的寄存器"""
+        forced = self._forced_writes & raw_values.keys()
+        self._forced_writes -= forced
+        writes = sorted(
+            (self.REGISTERS[name], name, raw)
+            for name, raw in raw_values.items()
+        )
+        needed, skipped = [], []
+        for write in writes:
+            if write[1] in forced or not self._is_confirmed(write[1], write[2]):
+                needed.append(write)
+            else:
+                skipped.append(write[1])
+        runs = self._group_runs(needed)
+        if skipped:
+            avoided = len(self._group_runs(writes)) - len(runs)
+            self.suppressed_writes += avoided
+            self.logger.debug(f"Skipping {skipped}, already set on the device ({avoided} requests avoided)")
+
+        success = True
+        written = {}
+        for run in runs:
+            start_address = run[0][0]
+            run_values = [raw for _, _, raw in run]
+            self.logger.debug(f"Writing {run_values} to registers starting at {start_address}")
+            self.sent_writes += 1
+            if len(run) == 1:
+                result = await self.modbus.write_single_register(
+                    start_address, run_values[0], unit_id=self.unit_id
+                )
+            else:
+                result = await self.modbus.write_registers(
+                    start_address, run_values, unit_id=self.unit_id
+                )
+            if not result:
+                success = False
+                continue
+            now = self._clock.monotonic()
+            for address, name, raw in run:
+                self._confirmed_at[address] = now
+                self._update_cache_value(name, raw)
+                written[name] = raw
+        if written:
+            self.confirm(written)
+        return success
+
+    async def async_set_power(self, state: bool, force=False):
         """设置电源状态"""
         self.logger.debug(f"Setting power to: {state}")
-        result = self.modbus.write_single_register(self.REGISTERS['power'], int(state))
-        if result:
-            self._update_cache_value('power', int(state))
-
-    @property
-    def mode(self):
-        """获取运行模式"""
-        value = self._get_register_value('mode')
-        self.logger.debug(f"Raw mode register value: {value}")
-        if value is None:
-            return None
-        
-        # 确保值在有效范围内
-        if not 0 <= value <= 5:
-            self.logger.warning(f"Invalid mode value: {value}, defaulting to MANUAL")
-            return OperationMode.MANUAL
-        
-        converted_mode = self._convert_mode_value(value)
-        self.logger.debug(f"Mode property returning: {converted_mode} (from value: {value})")
-        return converted_mode
+        return await self.apply({'power': state}, force=force)
 
-    @mode.setter
-    def mode(self, mode: OperationMode):
+    async def async_set_mode(self, mode: OperationMode, force=False):
         """设置运行模式"""
         value = self._convert_mode_string(mode)
         self.logger.debug(f"Setting mode to: {mode.value} (register value: {value})")
-        result = self.modbus.write_single_register(self.REGISTERS['mode'], value)
-        if result:
-            self._update_cache_value('mode', value)
-
-    def _convert_mode_value(self, value: int) -> OperationMode:
-        """Convert mode register value to OperationMode."""
-        mode_map = {
-            0: OperationMode.MANUAL,
-            1: OperationMode.AUTO,
-            2: OperationMode.TIMER
-        }
-        return mode_map.get(value, OperationMode.MANUAL)
+        return await self.apply({'mode': value}, force=force)
 
     def _convert_mode_string(self, mode: OperationMode) -> int:
         """Convert OperationMode to register value."""
@@ -287,86 +889,33 @@ class FreshAirSystem:
         }
         return mode_map.get(mode, 0)
 
-    @property
-    def supply_speed(self):
-        """Get supply speed setting as string."""
-        value = self._get_register_value('supply_speed')
-        speed_map = {1: "low", 2: "medium", 3: "high"}
-        return speed_map.get(value) if value is not None else None
-
-    @supply_speed.setter
-    def supply_speed(self, speed):
+    async def async_set_supply_speed(self, speed, force=False):
         """Set supply speed using either string or integer value."""
         validated_speed = self._validate_speed(speed)
         self.logger.debug(f"Setting supply speed to: {validated_speed}")
-        result = self.modbus.write_single_register(
-            self.REGISTERS['supply_speed'],
-            validated_speed
-        )
-        if result:
-            self._update_cache_value('supply_speed', validated_speed)
+        return await self.apply({'supply_speed': validated_speed}, force=force)
 
-    @property
-    def exhaust_speed(self):
-        """Get exhaust speed setting as string."""
-        value = self._get_register_value('exhaust_speed')
-        speed_map = {1: "low", 2: "medium", 3: "high"}
-        return speed_map.get(value) if value is not None else None
-
-    @exhaust_speed.setter
-    def exhaust_speed(self, speed):
+    async def async_set_exhaust_speed(self, speed, force=False):
         """Set exhaust speed using either string or integer value."""
         validated_speed = self._validate_speed(speed)
         self.logger.debug(f"Setting exhaust speed to: {validated_speed}")
-        result = self.modbus.write_single_register(
-            self.REGISTERS['exhaust_speed'],
-            validated_speed
-        )
-        if result:
-            self._update_cache_value('exhaust_speed', validated_speed)
+        return await self.apply({'exhaust_speed': validated_speed}, force=force)
 
-    @property
-    def bypass(self):
-        """获取旁通状态"""
-        return bool(self._get_register_value('bypass'))
-
-    @bypass.setter
-    def bypass(self, state: bool):
+    async def async_set_bypass(self, state: bool, force=False):
         """设置旁通状态"""
         self.logger.debug(f"Setting bypass to: {state}")
-        self.modbus.write_single_register(self.REGISTERS['bypass'], int(state))
-
-    @property
-    def actual_supply_speed(self):
-        """获取实际送风速度"""
-        return self._get_register_value('actual_supply')
-
-    @property
-    def actual_exhaust_speed(self):
-        """获取实际排风速度"""
-        return self._get_register_value('actual_exhaust')
-
-    @property
-    def temperature(self):
-        """获取温度（°C）"""
-        value = self._get_register_value('temperature')
-        return value / 10 if value is not None else None
-
-    @property
-    def humidity(self):
-        """获取湿度（%）"""
-        value = self._get_register_value('humidity')
-        return value / 10 if value is not None else None
+        return await self.apply({'bypass': state}, force=force)
 
 
 # 只在直接运行此文件时执行测试代码
 if __name__ == "__main__":
-    def test_fresh_air_system():
+    async def test_fresh_air_system():
         host = "192.168.6.137"
         # host="127.0.0.1"
         system = FreshAirSystem(host, 8899, 1)
 
         # 读取所有状态
+        await system.async_read_all_registers(force_refresh=True)
         print(f"电源状态: {system.power}")
         print(f"运行模式: {system.mode}")
         print(f"送风速度设置: {system.supply_speed}")
@@ -377,13 +926,15 @@ if __name__ == "__main__":
         print(f"温度: {system.temperature}°C")
         print(f"湿度: {system.humidity}%")
 
-        # system.power = True
-        system.exhaust_speed = 1
-        system.supply_speed = 1
+        # await system.async_set_power(True)
+        await system.async_set_exhaust_speed(1)
+        await system.async_set_supply_speed(1)
+        await system.async_read_all_registers(force_refresh=True)
         # print(f"电源状态: {system.power}")
         print(f"实际送风速度: {system.actual_supply_speed}")
         print(f"实际排风速度: {system.actual_exhaust_speed}")
         print(f"温度: {system.temperature}°C")
         print(f"湿度: {system.humidity}%")
+        system.modbus.close()
 
-    test_fresh_air_system()
+    asyncio.run(test_fresh_air_system())
@@ -0,0 +1,60 @@
+"""Shared Modbus connections per RS485 gateway."""
+from __future__ import annotations
+
+import logging
+
+from .clock import SYSTEM_CLOCK, Clock
+from .fresh_air_controller import ModbusClient
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ModbusHub:
+    """Registry of gateway connections keyed by host:port.
+
+    Several Madelon units can sit on one RS485 bus behind a single gateway,
+    and most gateways accept only one TCP client. Every config entry for the
+    same host:port gets the same ModbusClient; it serializes all requests and
+    is closed when the last entry releases it.
+    """
+
+    def __init__(self, clock: Clock = SYSTEM_CLOCK) -> None:
+        self._clock = clock
+        self._clients: dict[str, ModbusClient] = {}
+        self._refs: dict[str, int] = {}
+
+    @staticmethod
+    def _key(host: str, port: int) -> str:
+        return f"{host}:{port}"
+
+    def acquire(self, host: str, port: int) -> ModbusClient:
+        """Return the shared client for a gateway and take a reference."""
+        key = self._key(host, port)
+        if key not in self._clients:
+            _LOGGER.debug(f"Opening shared connection for gateway {key}")
+            self._clients[key] = ModbusClient(host=host, port=port, clock=self._clock)
+            self._refs[key] = 0
+        self._refs[key] += 1
+        return self._clients[key]
+
+    def release(self, host: str, port: int) -> None:
+        """Drop a reference and close the connection when none are left."""
+        key = self._key(host, port)
+        if key not in self._refs:
+            return
+        self._refs[key] -= 1
+        if self._refs[key] <= 0:
+            _LOGGER.debug(f"Closing shared connection for gateway {key}")
+            self._clients.pop(key).close()
+            del self._refs[key]
+
+    def clients(self):
+        """Return (host:port, ModbusClient) pairs for every open gateway."""
+        return list(self._clients.items())
+
+    def refcount(self, host: str, port: int) -> int:
+        """Return how many entries currently use a gateway."""
+        return self._refs.get(self._key(host, port), 0)
+
+    def __len__(self) -> int:
+        return len(self._clients)
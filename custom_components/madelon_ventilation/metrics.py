@@ -0,0 +1,192 @@
+"""Counters and latency histograms for the Modbus link and the register cache."""
+from __future__ import annotations
+
+from bisect import bisect_left
+import time
+
+# Histogram bucket upper bounds in seconds; slower responses land in the overflow bucket
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; percentiles are reported as bucket upper bounds."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last: float | None = None
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, fraction: float) -> float | None:
+        """Upper bound of the bucket holding the given fraction of samples."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        def ms(value):
+            return None if value is None else round(value * 1000, 1)
+
+        buckets = {f"le_{ms(bound):g}ms": count for bound, count in zip(self.buckets, self.counts)}
+        buckets["overflow"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.mean),
+            "p50_ms": ms(self.percentile(0.5)),
+            "p99_ms": ms(self.percentile(0.99)),
+            "max_ms": ms(self.max) if self.count else None,
+            "buckets": buckets,
+        }
+
+
+class UnitMetrics:
+    """Transactions of one unit (slave id) on a gateway."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.exception_responses = 0
+        self.consecutive_timeouts = 0  # requests without a reply since the last one
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = LatencyHistogram()
+
+    def record_response(self, seconds: float, sent: int, received: int, exception: bool = False) -> None:
+        """A reply arrived (normal or Modbus exception response)."""
+        self.requests += 1
+        self.consecutive_timeouts = 0
+        self.bytes_sent += sent
+        self.bytes_received += received
+        self.latency.observe(seconds)
+        if exception:
+            self.exception_responses += 1
+
+    def record_timeout(self, sent: int) -> None:
+        self.requests += 1
+        self.timeouts += 1
+        self.consecutive_timeouts += 1
+        self.bytes_sent += sent
+
+    def record_error(self) -> None:
+        """Failed before anything reached the gateway (not connected, ...)."""
+        self.requests += 1
+        self.errors += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "consecutive_timeouts": self.consecutive_timeouts,
+            "errors": self.errors,
+            "exception_responses": self.exception_responses,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class GatewayMetrics:
+    """Connection counters of one gateway plus per-unit transaction metrics."""
+
+    def __init__(self) -> None:
+        self.connects = 0
+        self.connect_failures = 0
+        self.units: dict[int, UnitMetrics] = {}
+
+    def unit(self, unit_id: int) -> UnitMetrics:
+        if unit_id not in self.units:
+            self.units[unit_id] = UnitMetrics()
+        return self.units[unit_id]
+
+    def remove_unit(self, unit_id: int) -> None:
+        """Forget a unit that no longer uses this gateway."""
+        self.units.pop(unit_id, None)
+
+    @property
+    def reconnects(self) -> int:
+        """Successful connects after the first one."""
+        return max(0, self.connects - 1)
+
+    def as_dict(self) -> dict:
+        return {
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "connect_failures": self.connect_failures,
+        }
+
+
+class CacheMetrics:
+    """Reads served from the register cache and how old the data was."""
+
+    def __init__(self, clock=time.time) -> None:
+        self._clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.last_age: float | None = None
+        self.max_age = 0.0
+
+    def record_read(self, timestamp: float | None) -> None:
+        """Record one read; ``timestamp`` of the data served, None on a miss."""
+        if timestamp is None:
+            self.misses += 1
+            return
+        self.hits += 1
+        self.last_age = max(0.0, self._clock() - timestamp)
+        self.max_age = max(self.max_age, self.last_age)
+
+    @property
+    def hit_ratio(self) -> float | None:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": None if self.hit_ratio is None else round(self.hit_ratio, 4),
+            "last_age_s": None if self.last_age is None else round(self.last_age, 1),
+            "max_age_s": round(self.max_age, 1),
+        }
+
+
+class BusMetrics:
+    """Time spent waiting for the bus, per priority class, and queue depth."""
+
+    def __init__(self) -> None:
+        self.waits: dict[str, LatencyHistogram] = {}
+        self.max_queue_depth = 0
+
+    def record_wait(self, priority, seconds: float) -> None:
+        name = priority.name.lower()
+        if name not in self.waits:
+            self.waits[name] = LatencyHistogram()
+        self.waits[name].observe(seconds)
+
+    def record_depth(self, depth: int) -> None:
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def as_dict(self) -> dict:
+        return {
+            "max_queue_depth": self.max_queue_depth,
+            "waits": {name: histogram.as_dict() for name, histogram in self.waits.items()},
+        }
@@ -0,0 +1,71 @@
+"""Plan FC03 block reads for a sparse register map."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+from .const import DEFAULT_GAP_COST, MAX_READ_REGISTERS
+
+
+@dataclass(frozen=True)
+class ReadSpan:
+    """A contiguous range of holding registers read with one request."""
+
+    start: int
+    count: int
+
+    @property
+    def end(self) -> int:
+        """Last address of the span (inclusive)."""
+        return self.start + self.count - 1
+
+    def __contains__(self, address: int) -> bool:
+        return self.start <= address <= self.end
+
+
+def plan_reads(
+    addresses: Iterable[int],
+    gap_cost: int = DEFAULT_GAP_COST,
+    max_count: int = MAX_READ_REGISTERS,
+) -> list[ReadSpan]:
+    """Return the cheapest set of spans covering all ``addresses``.
+
+    Each request costs ``gap_cost`` registers of overhead on top of the
+    registers it transfers, so a gap is read through only when that is
+    cheaper than issuing another request. No span exceeds ``max_count``.
+    """
+    points = sorted(set(addresses))
+    if not points:
+        return []
+    if max_count < 1:
+        raise ValueError("max_count must be at least 1")
+
+    n = len(points)
+    # best[i]: cost of covering points[:i]; cut[i]: start index of the last span
+    best = [0] + [float("inf")] * n
+    cut = [0] * (n + 1)
+    for i in range(1, n + 1):
+        last = points[i - 1]
+        for j in range(i - 1, -1, -1):
+            length = last - points[j] + 1
+            if length > max_count:
+                break
+            cost = best[j] + gap_cost + length
+            if cost < best[i]:
+                best[i] = cost
+                cut[i] = j
+
+    spans = []
+    i = n
+    while i > 0:
+        j = cut[i]
+        spans.append(ReadSpan(points[j], points[i - 1] - points[j] + 1))
+        i = j
+    spans.reverse()
+    return spans
+
+
+def spans_for(spans: Iterable[ReadSpan], addresses: Iterable[int]) -> list[ReadSpan]:
+    """Return the spans from a plan that are needed for ``addresses``."""
+    wanted = set(addresses)
+    return [span for span in spans if any(address in span for address in wanted)]
@@ -0,0 +1,111 @@
+"""Read-back confirmation of register writes."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+import logging
+
+from .const import CONFIRM_RETRY_DELAYS
+from .trace import trace_caller
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ReadBackConfirmer:
+    """Confirm writes with a small read of just the registers involved.
+
+    ``confirm()`` merges the expected values into the pending confirmation
+    and returns its future. After each delay in ``delays`` the written
+    registers, plus related feedback registers that only need refreshing,
+    are read once. The future resolves True as soon as every written
+    register reads back its expected value, and False when the attempts run
+    out. Writes made while a confirmation is pending join it.
+    """
+
+    def __init__(
+        self,
+        read: Callable[[Iterable[int]], Awaitable[dict[int, int] | None]],
+        delays: Iterable[float] = CONFIRM_RETRY_DELAYS,
+    ) -> None:
+        self._read = read
+        self.delays = tuple(delays)
+        self.confirmed = 0
+        self.unconfirmed = 0
+        self.retries = 0
+        self._expected: dict[int, int] = {}
+        self._related: set[int] = set()
+        self._result: asyncio.Future | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> asyncio.Future | None:
+        """Future of the confirmation in progress, None when idle."""
+        return self._result
+
+    def confirm(self, expected: dict[int, int], related: Iterable[int] = ()) -> asyncio.Future:
+        """Expect ``expected`` ({address: raw value}) on the device."""
+        self._expected.update(expected)
+        self._related.update(related)
+        if self._result is None:
+            loop = asyncio.get_running_loop()
+            self._result = loop.create_future()
+            self._task = loop.create_task(self._run(self._result))
+        return self._result
+
+    async def _run(self, result: asyncio.Future) -> None:
+        trace_caller.set("read_back")
+        try:
+            for attempt, delay in enumerate(self.delays):
+                if attempt:
+                    self.retries += 1
+                await asyncio.sleep(delay)
+                expected = dict(self._expected)
+                registers = await self._read(expected.keys() | self._related)
+                if registers is None:
+                    continue
+                for address, value in expected.items():
+                    # A newer write to the same address waits for the next attempt
+                    if registers.get(address) == value and self._expected.get(address) == value:
+                        del self._expected[address]
+                if not self._expected:
+                    self.confirmed += 1
+                    self._finish(result, True)
+                    return
+            self.unconfirmed += 1
+            _LOGGER.warning(
+                f"Write not confirmed after {len(self.delays)} read-backs, expected {self._expected}"
+            )
+            self._finish(result, False)
+        except asyncio.CancelledError:
+            result.cancel()
+            raise
+        except Exception as err:
+            _LOGGER.error(f"Error confirming write: {err}")
+            self.unconfirmed += 1
+            self._finish(result, False)
+
+    def _finish(self, result: asyncio.Future, confirmed: bool) -> None:
+        self._expected.clear()
+        self._related.clear()
+        self._result = None
+        self._task = None
+        result.set_result(confirmed)
+
+    def close(self) -> None:
+        """Stop the pending confirmation; its future is cancelled."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._result is not None:
+            self._result.cancel()
+            self._result = None
+        self._expected.clear()
+        self._related.clear()
+
+    def as_dict(self) -> dict:
+        return {
+            "confirmed": self.confirmed,
+            "unconfirmed": self.unconfirmed,
+            "retries": self.retries,
+            "pending": self._result is not None,
+        }
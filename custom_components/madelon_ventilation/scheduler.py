@@ -0,0 +1,124 @@
+"""Adaptive polling scheduler for the Madelon Ventilation integration."""
+from __future__ import annotations
+
+import time
+
+from .const import (
+    DEFAULT_SCAN_INTERVAL,
+    FAST_POLL_WINDOW,
+    FAST_SCAN_INTERVAL,
+    MAX_FAILURE_BACKOFF,
+    MAX_STABLE_BACKOFF,
+    MIN_SCAN_INTERVAL,
+    STABLE_POLLS_BEFORE_BACKOFF,
+)
+
+
+class AdaptivePollScheduler:
+    """Pick the next poll delay from the configured interval and recent activity.
+
+    - after a write or a detected change: poll every ``fast_interval`` for
+      ``fast_window`` seconds so slider/button feedback is quick
+    - after ``stable_polls`` unchanged polls: double the delay, up to
+      ``max_stable_backoff`` times the configured interval
+    - on consecutive failures: double the delay, up to
+      ``max_failure_backoff`` times the configured interval
+    """
+
+    def __init__(
+        self,
+        scan_interval: float = DEFAULT_SCAN_INTERVAL,
+        fast_interval: float = FAST_SCAN_INTERVAL,
+        fast_window: float = FAST_POLL_WINDOW,
+        stable_polls: int = STABLE_POLLS_BEFORE_BACKOFF,
+        max_stable_backoff: float = MAX_STABLE_BACKOFF,
+        max_failure_backoff: float = MAX_FAILURE_BACKOFF,
+        clock=time.monotonic,
+    ) -> None:
+        self.scan_interval = max(float(scan_interval), MIN_SCAN_INTERVAL)
+        self.fast_interval = fast_interval
+        self.fast_window = fast_window
+        self.stable_polls = stable_polls
+        self.max_stable_backoff = max_stable_backoff
+        self.max_failure_backoff = max_failure_backoff
+        self._clock = clock
+        self._fast_until = 0.0
+        self._unchanged = 0
+        self._failures = 0
+
+    def set_scan_interval(self, scan_interval: float) -> None:
+        """Change the baseline interval (options flow)."""
+        self.scan_interval = max(float(scan_interval), MIN_SCAN_INTERVAL)
+
+    def note_activity(self) -> None:
+        """Enter the fast polling window, e.g. after a write."""
+        self._fast_until = self._clock() + self.fast_window
+        self._unchanged = 0
+
+    def record_success(self, changed: bool) -> None:
+        """Record a successful poll and whether any value changed."""
+        self._failures = 0
+        if changed:
+            self.note_activity()
+        else:
+            self._unchanged += 1
+
+    def record_failure(self) -> None:
+        """Record a failed poll."""
+        self._failures += 1
+
+    @property
+    def in_fast_window(self) -> bool:
+        """Return True while fast polling is active."""
+        return self._clock() < self._fast_until
+
+    def next_interval(self) -> float:
+        """Return the delay in seconds until the next poll."""
+        if self._failures:
+            factor = min(2 ** (self._failures - 1), self.max_failure_backoff)
+            return self.scan_interval * factor
+        if self.in_fast_window:
+            return min(self.fast_interval, self.scan_interval)
+        if self._unchanged >= self.stable_polls:
+            steps = self._unchanged - self.stable_polls + 1
+            return self.scan_interval * min(2 ** steps, self.max_stable_backoff)
+        return self.scan_interval
+
+
+class PollDecisions:
+    """When a poll or a write counts as activity for the scheduler.
+
+    MadelonCoordinator and tools/simulate_day.py both go through this, so
+    the simulation runs the production decisions rather than a copy.
+    """
+
+    def __init__(self, system, scheduler: AdaptivePollScheduler) -> None:
+        self.scheduler = scheduler
+        self._system = system
+        # Telemetry drifts on every poll; only the control group counts as activity
+        self.activity_mask = system.register_mask(system.REGISTER_GROUPS["control"])
+        self._sent_writes = system.sent_writes
+
+    def poll_finished(self, data, previous) -> float:
+        """Record a poll (``data`` None if it failed) and return the next delay.
+
+        ``previous`` is the snapshot the entities showed before the poll.
+        """
+        if data is None:
+            self.scheduler.record_failure()
+        else:
+            self.scheduler.record_success(
+                changed=previous is not None and bool(data.changed_mask(previous) & self.activity_mask)
+            )
+        return self.scheduler.next_interval()
+
+    def writes_finished(self) -> bool:
+        """Enter the fast polling window if a write went out since the last call.
+
+        Writes skipped as already set on the device are not activity.
+        """
+        if self._system.sent_writes == self._sent_writes:
+            return False
+        self._sent_writes = self._system.sent_writes
+        self.scheduler.note_activity()
+        return True
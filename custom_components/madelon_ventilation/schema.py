@@ -0,0 +1,114 @@
+"""Declarative register schema compiled into a flat decode plan."""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+
+@dataclass(frozen=True)
+class RegisterField:
+    """One holding register and how its raw value is decoded.
+
+    ``key`` names the decoded value and defaults to ``name``. A raw value
+    is first read as two's complement when ``signed``, then either looked
+    up in ``enum`` (``default`` for values missing from the table),
+    converted with ``bool`` when ``boolean``, or multiplied by ``scale``
+    and rounded to ``precision`` digits.
+
+    Fields with an ``entity_name`` also get a sensor entity. Its unique id
+    suffix is ``unique_id``, which defaults to ``key``.
+    """
+
+    name: str
+    address: int
+    group: str = "control"
+    key: str | None = None
+    signed: bool = False
+    enum: Mapping[int, Any] | None = None
+    default: Any = None
+    boolean: bool = False
+    scale: float = 1
+    precision: int | None = None
+    unit: str | None = None
+    device_class: str | None = None
+    entity_name: str | None = None
+    unique_id: str | None = None
+    doc: str | None = None
+
+    @property
+    def value_key(self) -> str:
+        return self.key or self.name
+
+
+def _compile_decoder(field: RegisterField) -> Callable[[int], Any] | None:
+    """Build the raw -> value function of one field once; None passes raw through."""
+    if field.enum is not None:
+        lookup, default = dict(field.enum).get, field.default
+        convert = lambda raw: lookup(raw, default)  # noqa: E731
+    elif field.boolean:
+        convert = bool
+    elif field.scale != 1 or field.precision is not None:
+        scale, precision = field.scale, field.precision
+        convert = lambda raw: round(raw * scale, precision)  # noqa: E731
+    else:
+        convert = None
+    if not field.signed:
+        return convert
+    if convert is None:
+        return lambda raw: raw - 0x10000 if raw & 0x8000 else raw
+    return lambda raw: convert(raw - 0x10000 if raw & 0x8000 else raw)
+
+
+class RegisterSchema:
+    """Compiled schema: register map, groups and a flat decode plan.
+
+    The plan is a tuple of ``(key, address, decoder)`` steps built once.
+    Decoding a snapshot is a single pass over it, with no per-value
+    dispatch or lookup tables rebuilt on each call.
+    """
+
+    def __init__(self, fields: Iterable[RegisterField], groups: Iterable[str] = ()) -> None:
+        self.fields = tuple(fields)
+        for attribute in ("name", "value_key", "address"):
+            seen = [getattr(field, attribute) for field in self.fields]
+            duplicates = {value for value in seen if seen.count(value) > 1}
+            if duplicates:
+                raise ValueError(f"Duplicate register {attribute}: {sorted(duplicates)}")
+        self.registers = MappingProxyType({field.name: field.address for field in self.fields})
+        grouped: dict[str, list[str]] = {group: [] for group in groups}
+        for field in self.fields:
+            grouped.setdefault(field.group, []).append(field.name)
+        self.groups = MappingProxyType({group: tuple(names) for group, names in grouped.items()})
+        self.by_key = MappingProxyType({field.value_key: field for field in self.fields})
+        self._plan = tuple(
+            (field.value_key, field.address, _compile_decoder(field)) for field in self.fields
+        )
+
+    def decode(self, get: Callable[[int], int | None]) -> dict[str, Any]:
+        """Decode every field with ``get(address)``; unread registers decode to None."""
+        values = {}
+        for key, address, decoder in self._plan:
+            raw = get(address)
+            values[key] = raw if raw is None or decoder is None else decoder(raw)
+        return values
+
+    def entity_fields(self) -> tuple[RegisterField, ...]:
+        """Fields that declare a sensor entity."""
+        return tuple(field for field in self.fields if field.entity_name is not None)
+
+
+def register_properties(cls):
+    """Class decorator: one read-only property per decoded value of ``cls.SCHEMA``.
+
+    Each property returns the value decoded when the snapshot was installed,
+    via ``cls._get_decoded(key)``. Properties the class defines itself are
+    kept.
+    """
+    for field in cls.SCHEMA.fields:
+        key = field.value_key
+        if key in vars(cls):
+            continue
+        setattr(cls, key, property(lambda self, key=key: self._get_decoded(key), doc=field.doc))
+    return cls
@@ -1,155 +1,300 @@
-from homeassistant.components.sensor import SensorEntity
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers.device_registry import DeviceInfo
-from .const import (
-    DOMAIN,
-    DEVICE_MANUFACTURER,
-    DEVICE_MODEL,
-    DEVICE_SW_VERSION,
-)
-from .fresh_air_controller import FreshAirSystem
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
+    SensorEntityDescription,
     SensorStateClass,
 )
-from homeassistant.const import UnitOfTemperature, PERCENTAGE, CONF_HOST
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTime,
+    PERCENTAGE,
+)
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
+from homeassistant.helpers.typing import StateType
+from .const import DEADBAND_SENSORS, DOMAIN
+from .coordinator import MadelonCoordinator
+from .entity import MadelonEntity
+from .filters import DeadbandFilter, deadband_options
+from .fresh_air_controller import FreshAirSystem
+from .schema import RegisterField
 import logging
 
 
-async def async_setup_entry(hass, config_entry, async_add_entities):
+async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
     """Set up the Fresh Air System sensors."""
     logging.getLogger(__name__).info("Setting up Fresh Air System sensors")
-    fresh_air_system = hass.data[DOMAIN][config_entry.entry_id]["system"]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
 
-    temperature_sensor = FreshAirTemperatureSensor(config_entry, fresh_air_system)
-    humidity_sensor = FreshAirHumiditySensor(config_entry, fresh_air_system)
-    supplySpeed_sensor = FreshAirSupplySpeedSensor(config_entry, fresh_air_system)
-    exhaustSpeed_sensor = FreshAirExhaustSpeedSensor(config_entry, fresh_air_system)
+    async_add_entities([
+        *(
+            (FreshAirMeasurementSensor if description.key in DEADBAND_SENSORS else MadelonRegisterSensor)(
+                config_entry, coordinator, description
+            )
+            for description in REGISTER_SENSORS
+        ),
+        *(
+            MadelonMetricSensor(config_entry, coordinator, description)
+            for description in METRIC_SENSORS
+        ),
+    ])
 
-    # Register sensors with the system
-    fresh_air_system.register_sensor(temperature_sensor)
-    fresh_air_system.register_sensor(humidity_sensor)
-    fresh_air_system.register_sensor(supplySpeed_sensor)
-    fresh_air_system.register_sensor(exhaustSpeed_sensor)
 
-    async_add_entities([temperature_sensor, humidity_sensor, supplySpeed_sensor, exhaustSpeed_sensor])
+@dataclass(frozen=True, kw_only=True)
+class MadelonRegisterDescription(SensorEntityDescription):
+    """Sensor generated from a field of FreshAirSystem.SCHEMA."""
 
+    register: str
+    unique_id: str
 
-class FreshAirTemperatureSensor(SensorEntity):
-    _attr_has_entity_name = True
-    _attr_name = "Temperature"
-    _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
-    _attr_state_class = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.TEMPERATURE
 
-    def __init__(self, entry: ConfigEntry, system):
-        super().__init__()
-        self._system = system
-        self._attr_unique_id = f"{entry.entry_id}_temperature"
-        self._attr_native_value = None
+def _register_description(field: RegisterField) -> MadelonRegisterDescription:
+    is_enum = field.device_class == SensorDeviceClass.ENUM
+    return MadelonRegisterDescription(
+        key=field.value_key,
+        name=field.entity_name,
+        register=field.name,
+        unique_id=field.unique_id or field.value_key,
+        native_unit_of_measurement=field.unit,
+        device_class=None if field.device_class is None else SensorDeviceClass(field.device_class),
+        state_class=None if is_enum else SensorStateClass.MEASUREMENT,
+        options=list(dict.fromkeys(field.enum.values())) if is_enum else None,
+    )
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information about this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._system.unique_identifier)},
-            name="Fresh Air System",
-            manufacturer=DEVICE_MANUFACTURER,
-            model=DEVICE_MODEL,
-            sw_version=DEVICE_SW_VERSION,
-        )
 
-    def update(self) -> None:
-        """Update the sensor."""
-        self._attr_native_value = self._system.temperature
+REGISTER_SENSORS: tuple[MadelonRegisterDescription, ...] = tuple(
+    _register_description(field) for field in FreshAirSystem.SCHEMA.entity_fields()
+)
 
 
-class FreshAirHumiditySensor(SensorEntity):
-    _attr_has_entity_name = True
-    _attr_name = "Humidity"
-    _attr_native_unit_of_measurement = PERCENTAGE
-    _attr_state_class = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.HUMIDITY
+class MadelonRegisterSensor(MadelonEntity, SensorEntity):
+    """Sensor showing one decoded register value."""
 
-    def __init__(self, entry: ConfigEntry, system):
-        super().__init__()
-        self._system = system
-        self._attr_unique_id = f"{entry.entry_id}_humidity"
-        self._attr_native_value = None
+    entity_description: MadelonRegisterDescription
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        coordinator: MadelonCoordinator,
+        description: MadelonRegisterDescription,
+    ) -> None:
+        self._registers = (description.register,)
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{entry.entry_id}_{description.unique_id}"
 
     @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information about this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._system.unique_identifier)},
-            name="Fresh Air System",
-            manufacturer=DEVICE_MANUFACTURER,
-            model=DEVICE_MODEL,
-            sw_version=DEVICE_SW_VERSION,
-        )
+    def native_value(self) -> StateType:
+        """Return the value from the latest poll."""
+        return self._get_value(self.entity_description.key)
 
-    def update(self) -> None:
-        """Update the sensor."""
-        self._attr_native_value = self._system.humidity
 
+class FreshAirMeasurementSensor(MadelonRegisterSensor):
+    """Measurement sensor that publishes through a deadband filter."""
 
-class FreshAirSupplySpeedSensor(SensorEntity):
-    _attr_has_entity_name = True
-    _attr_name = "SupplyFan"
-    _attr_state_class = None
-    _attr_device_class = SensorDeviceClass.ENUM
+    # Writes are already rate limited by the filter; a heartbeat must reach the recorder
+    _attr_force_update = True
 
-    def __init__(self, entry: ConfigEntry, system):
-        super().__init__()
-        self._system = system
-        self._attr_unique_id = f"{entry.entry_id}_SupplySpeed"
-        self._options = {1, 2, 3, 0}
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        coordinator: MadelonCoordinator,
+        description: MadelonRegisterDescription,
+    ) -> None:
+        super().__init__(entry, coordinator, description)
+        self._entry = entry
+        # The controller's clock, so hold-offs follow simulated time too
+        self._deadband = DeadbandFilter(
+            **deadband_options(entry.options, description.key), clock=self._system.clock.monotonic
+        )
         self._attr_native_value = None
 
     @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information about this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._system.unique_identifier)},
-            name="Fresh Air System",
-            manufacturer=DEVICE_MANUFACTURER,
-            model=DEVICE_MODEL,
-            sw_version=DEVICE_SW_VERSION,
-        )
+    def native_value(self) -> StateType:
+        """Return the last published value."""
+        return self._attr_native_value
 
-    def update(self) -> None:
-        """Update the sensor."""
-        self._attr_native_value = self._system.supply_speed
+    async def async_added_to_hass(self) -> None:
+        """Publish the initial value and follow option changes."""
+        self._publish(self._get_value(self.entity_description.key))
+        await super().async_added_to_hass()
+        self.async_on_remove(self._entry.add_update_listener(self._async_options_updated))
 
+    async def _async_options_updated(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Apply new deadband options without reloading the entry."""
+        self._deadband.configure(**deadband_options(entry.options, self.entity_description.key))
 
-class FreshAirExhaustSpeedSensor(SensorEntity):
-    _attr_has_entity_name = True
-    _attr_name = "ExhaustFan"
-    _attr_state_class = None
-    _attr_device_class = SensorDeviceClass.ENUM
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the value leaves the deadband."""
+        value = self._get_value(self.entity_description.key)
+        status_changed = self._status_changed()
+        if status_changed or self._deadband.should_publish(value):
+            self._publish(value)
+            self.async_write_ha_state()
 
-    def __init__(self, entry: ConfigEntry, system):
-        super().__init__()
-        self._system = system
-        self._attr_unique_id = f"{entry.entry_id}_ExhaustSpeed"
-        self._options = {1, 2, 3, 0}
-        self._attr_native_value = None
+    def _publish(self, value) -> None:
+        self._attr_native_value = value
+        self._deadband.mark_published(value)
+
+
+@dataclass(frozen=True, kw_only=True)
+class MadelonMetricDescription(SensorEntityDescription):
+    """Link or cache metric read from the FreshAirSystem."""
+
+    value_fn: Callable[[FreshAirSystem], StateType]
+    attributes_fn: Callable[[FreshAirSystem], dict[str, Any]] | None = None
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _latency_attributes(system: FreshAirSystem) -> dict[str, Any]:
+    latency = system.link_metrics.latency.as_dict()
+    latency.pop("buckets")
+    return latency
+
+
+def _bus_wait(system: FreshAirSystem, priority: str) -> float | None:
+    """p99 time a transaction of this priority waited for the gateway bus."""
+    histogram = system.modbus.bus.metrics.waits.get(priority)
+    return None if histogram is None else histogram.percentile(0.99)
+
+
+METRIC_SENSORS: tuple[MadelonMetricDescription, ...] = (
+    MadelonMetricDescription(
+        key="link_latency",
+        name="Modbus latency",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda system: _milliseconds(system.link_metrics.latency.percentile(0.5)),
+        attributes_fn=_latency_attributes,
+    ),
+    MadelonMetricDescription(
+        key="bus_write_wait",
+        name="Bus write wait",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda system: _milliseconds(_bus_wait(system, "interactive")),
+        attributes_fn=lambda system: {
+            "queue_depth": system.modbus.bus.queue_depth,
+            "max_queue_depth": system.modbus.bus.metrics.max_queue_depth,
+            **{
+                f"{name}_p99_ms": _milliseconds(histogram.percentile(0.99))
+                for name, histogram in system.modbus.bus.metrics.waits.items()
+            },
+        },
+    ),
+    MadelonMetricDescription(
+        key="link_timeouts",
+        name="Modbus timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda system: system.link_metrics.timeouts,
+    ),
+    MadelonMetricDescription(
+        key="link_exceptions",
+        name="Modbus exception responses",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda system: system.link_metrics.exception_responses,
+    ),
+    MadelonMetricDescription(
+        key="gateway_reconnects",
+        name="Gateway reconnects",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda system: system.modbus.metrics.reconnects,
+    ),
+    MadelonMetricDescription(
+        key="bytes_sent",
+        name="Modbus bytes sent",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda system: system.link_metrics.bytes_sent,
+    ),
+    MadelonMetricDescription(
+        key="bytes_received",
+        name="Modbus bytes received",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda system: system.link_metrics.bytes_received,
+    ),
+    MadelonMetricDescription(
+        key="suppressed_writes",
+        name="Writes suppressed",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda system: system.suppressed_writes,
+        attributes_fn=lambda system: {"superseded_writes": system.superseded_writes},
+    ),
+    MadelonMetricDescription(
+        key="cache_hit_ratio",
+        name="Cache hit ratio",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda system: (
+            None if system.cache_metrics.hit_ratio is None
+            else round(system.cache_metrics.hit_ratio * 100, 1)
+        ),
+    ),
+    MadelonMetricDescription(
+        key="data_age",
+        name="Data age",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda system: (
+            None if system.cache_metrics.last_age is None
+            else round(system.cache_metrics.last_age, 1)
+        ),
+        attributes_fn=lambda system: {"max_age": round(system.cache_metrics.max_age, 1)},
+    ),
+)
+
+
+class MadelonMetricSensor(MadelonEntity, SensorEntity):
+    """Diagnostic sensor for link and cache metrics, disabled by default."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    entity_description: MadelonMetricDescription
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        coordinator: MadelonCoordinator,
+        description: MadelonMetricDescription,
+    ) -> None:
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
 
     @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information about this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._system.unique_identifier)},
-            name="Fresh Air System",
-            manufacturer=DEVICE_MANUFACTURER,
-            model=DEVICE_MODEL,
-            sw_version=DEVICE_SW_VERSION,
-        )
+    def available(self) -> bool:
+        """Metrics matter most while the gateway is failing."""
+        return True
+
+    @property
+    def native_value(self) -> StateType:
+        return self.entity_description.value_fn(self._system)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        if self.entity_description.attributes_fn is None:
+            return None
+        return self.entity_description.attributes_fn(self._system)
 
-    def update(self) -> None:
-        """Update the sensor."""
-        self._attr_native_value = self._system.exhaust_speed
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Counters move on every poll, successful or not."""
+        self.async_write_ha_state()
@@ -0,0 +1,123 @@
+"""Services for the Madelon Ventilation integration."""
+from __future__ import annotations
+
+from functools import partial
+import json
+import os
+from pathlib import PurePath
+import time
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DATA_HUB,
+    DOMAIN,
+    SERVICE_DUMP_TRACE,
+    SERVICE_START_CAPTURE,
+    SERVICE_STOP_CAPTURE,
+)
+
+ATTR_FILENAME = "filename"
+
+
+def _relative_filename(value) -> str:
+    """A plain file name: no absolute paths, no ``..``."""
+    filename = PurePath(str(value))
+    if filename.is_absolute() or ".." in filename.parts or not filename.name:
+        raise vol.Invalid(f"{value} must be a file name relative to the {DOMAIN} folder")
+    return str(filename)
+
+
+DUMP_TRACE_SCHEMA = vol.Schema({vol.Optional(ATTR_FILENAME): _relative_filename})
+START_CAPTURE_SCHEMA = vol.Schema({vol.Optional(ATTR_FILENAME): _relative_filename})
+STOP_CAPTURE_SCHEMA = vol.Schema({})
+
+
+def _make_parent(path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+async def _async_output_path(hass: HomeAssistant, filename: str) -> str:
+    """Path of ``filename`` in <config>/madelon_ventilation/, parent folders created."""
+    path = hass.config.path(DOMAIN, filename)
+    try:
+        await hass.async_add_executor_job(_make_parent, path)
+    except OSError as err:
+        raise HomeAssistantError(f"Cannot create the folder for {path}: {err}") from err
+    return path
+
+
+def _write_trace(path: str, lines: list[str]) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        file.writelines(lines)
+
+
+async def _async_dump_trace(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Write every gateway's transaction trace to a JSON lines file."""
+    filename = call.data.get(ATTR_FILENAME) or f"trace_{dt_util.now():%Y%m%d-%H%M%S}.jsonl"
+    path = await _async_output_path(hass, filename)
+
+    # Trace timestamps are monotonic, convert them to epoch seconds
+    wall_offset = time.time() - time.monotonic()
+    lines = []
+    transactions = 0
+    for gateway, client in _clients(hass):
+        for entry in client.trace.entries():
+            lines.append(json.dumps({"gateway": gateway, **entry.as_dict(wall_offset)}) + "\n")
+            transactions += 1
+    await hass.async_add_executor_job(_write_trace, path, lines)
+    return {"path": path, "transactions": transactions}
+
+
+async def _async_start_capture(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Capture the traffic of every gateway, one binary file per gateway."""
+    filename = PurePath(call.data.get(ATTR_FILENAME) or f"capture_{dt_util.now():%Y%m%d-%H%M%S}.bin")
+    paths = {}
+    for gateway, client in _clients(hass):
+        # One file per gateway: the gateway goes between the name and its suffix
+        name = filename.with_name(f"{filename.stem}_{gateway.replace(':', '_')}{filename.suffix or '.bin'}")
+        path = await _async_output_path(hass, str(name))
+        try:
+            await client.start_capture(path)
+        except OSError as err:
+            raise HomeAssistantError(f"Cannot open {path}: {err}") from err
+        paths[gateway] = path
+    return {"files": paths}
+
+
+async def _async_stop_capture(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Stop capturing and report how many transactions each file holds."""
+    files = {}
+    for gateway, client in _clients(hass):
+        path = client.capture.path if client.capture is not None else None
+        records = await client.stop_capture()
+        if records is not None:
+            files[gateway] = {"path": path, "transactions": records}
+    return {"files": files}
+
+
+def _clients(hass: HomeAssistant):
+    """(host:port, ModbusClient) for every open gateway connection."""
+    hub = hass.data.get(DATA_HUB)
+    return hub.clients() if hub is not None else ()
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    for service, handler, schema in (
+        (SERVICE_DUMP_TRACE, _async_dump_trace, DUMP_TRACE_SCHEMA),
+        (SERVICE_START_CAPTURE, _async_start_capture, START_CAPTURE_SCHEMA),
+        (SERVICE_STOP_CAPTURE, _async_stop_capture, STOP_CAPTURE_SCHEMA),
+    ):
+        hass.services.async_register(
+            DOMAIN,
+            service,
+            partial(handler, hass),
+            schema=schema,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
@@ -0,0 +1,109 @@
+"""Immutable, versioned register snapshots."""
+from __future__ import annotations
+
+from array import array
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping
+
+
+def address_mask(addresses: Iterable[int]) -> int:
+    """Return a bitmask with one bit set per register address."""
+    mask = 0
+    for address in addresses:
+        mask |= 1 << address
+    return mask
+
+
+class RegisterSnapshot:
+    """Raw holding registers from one poll plus their decoded values.
+
+    Registers are stored in an ``array('H')`` starting at ``base``; ``valid``
+    is a bitmask of the addresses that were actually read (gaps skipped by
+    the read planner are not valid). ``changed`` is the bitmask of addresses
+    that differ from the snapshot this one replaced, so entities can test
+    ``snapshot.changed & their_mask`` instead of comparing values.
+    Instances are never modified after construction.
+    """
+
+    __slots__ = ("base", "registers", "valid", "version", "timestamp", "changed", "values")
+
+    def __init__(
+        self,
+        base: int,
+        registers: array,
+        valid: int,
+        version: int,
+        timestamp: float,
+        changed: int = 0,
+        values: Mapping[str, Any] | None = None,
+    ) -> None:
+        set_ = object.__setattr__
+        set_(self, "base", base)
+        set_(self, "registers", registers)
+        set_(self, "valid", valid)
+        set_(self, "version", version)
+        set_(self, "timestamp", timestamp)
+        set_(self, "changed", changed)
+        set_(self, "values", MappingProxyType(dict(values or {})))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RegisterSnapshot is immutable")
+
+    @classmethod
+    def build(
+        cls,
+        registers: Mapping[int, int],
+        version: int,
+        timestamp: float,
+        previous: RegisterSnapshot | None = None,
+        values: Mapping[str, Any] | None = None,
+    ) -> RegisterSnapshot:
+        """Create a snapshot from ``{address: value}``."""
+        if registers:
+            base = min(registers)
+            data = array("H", bytes(2 * (max(registers) - base + 1)))
+            for address, value in registers.items():
+                data[address - base] = value
+        else:
+            base, data = 0, array("H")
+        snapshot = cls(base, data, address_mask(registers), version, timestamp, 0, values)
+        changed = snapshot.changed_mask(previous) if previous is not None else snapshot.valid
+        object.__setattr__(snapshot, "changed", changed)
+        return snapshot
+
+    def get(self, address: int) -> int | None:
+        """Return the raw value of a register, or None if it was not read."""
+        if not (self.valid >> address) & 1:
+            return None
+        return self.registers[address - self.base]
+
+    def as_dict(self) -> dict[int, int]:
+        """Return ``{address: value}`` for every valid register."""
+        return {
+            self.base + offset: value
+            for offset, value in enumerate(self.registers)
+            if (self.valid >> (self.base + offset)) & 1
+        }
+
+    def changed_mask(self, other: RegisterSnapshot | None) -> int:
+        """Return the bitmask of addresses whose value or validity differs."""
+        if other is None:
+            return self.valid
+        mask = self.valid ^ other.valid
+        common = self.valid & other.valid
+        if self.base == other.base:
+            # Fast path: same layout, compare the arrays element by element
+            for offset, (a, b) in enumerate(zip(self.registers, other.registers)):
+                if a != b and (common >> (self.base + offset)) & 1:
+                    mask |= 1 << (self.base + offset)
+            return mask
+        for address, value in self.as_dict().items():
+            if (common >> address) & 1 and other.get(address) != value:
+                mask |= 1 << address
+        return mask
+
+    def __repr__(self) -> str:
+        return (
+            f"RegisterSnapshot(version={self.version}, base={self.base}, "
+            f"registers={self.registers.tolist()})"
+        )
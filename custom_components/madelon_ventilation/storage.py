@@ -0,0 +1,84 @@
+"""Persist the last register snapshot for instant startup."""
+from __future__ import annotations
+
+from array import array
+import logging
+import sys
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .snapshot import RegisterSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 30  # seconds, batches bursts of polls/writes into one disk write
+
+
+def _encode(snapshot: RegisterSnapshot) -> dict:
+    """Serialize a snapshot compactly.
+
+    Only registers that were actually read are stored, in address order, as
+    little-endian hex; ``valid`` says which addresses they belong to.
+    """
+    registers = array("H", snapshot.as_dict().values())
+    if sys.byteorder == "big":
+        registers.byteswap()
+    return {
+        "registers": registers.tobytes().hex(),
+        # hex string: the mask can exceed 64 bits, which JSON encoders reject
+        "valid": format(snapshot.valid, "x"),
+        "timestamp": snapshot.timestamp,
+    }
+
+
+def _decode(data: dict) -> tuple[dict[int, int], float]:
+    """Return ``({address: value}, timestamp)`` from stored data."""
+    registers = array("H", bytes.fromhex(data["registers"]))
+    if sys.byteorder == "big":
+        registers.byteswap()
+    valid = int(data["valid"], 16)
+    addresses = [address for address in range(valid.bit_length()) if (valid >> address) & 1]
+    if len(addresses) != len(registers):
+        raise ValueError("register count does not match the valid mask")
+    return dict(zip(addresses, registers)), data["timestamp"]
+
+
+class SnapshotStore:
+    """Last known registers of one config entry, kept in .storage."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store: Store[dict] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+        self._pending: RegisterSnapshot | None = None
+
+    async def async_load(self) -> tuple[dict[int, int], float] | None:
+        """Return the stored registers and their timestamp, if any."""
+        try:
+            data = await self._store.async_load()
+            return _decode(data) if data else None
+        except (KeyError, TypeError, ValueError) as e:
+            _LOGGER.warning(f"Ignoring unreadable stored snapshot: {e}")
+            return None
+
+    @callback
+    def async_save(self, snapshot: RegisterSnapshot) -> None:
+        """Schedule a delayed save of ``snapshot``."""
+        self._pending = snapshot
+        self._store.async_delay_save(self._encode_pending, SAVE_DELAY)
+
+    def _encode_pending(self) -> dict:
+        snapshot, self._pending = self._pending, None
+        return _encode(snapshot)
+
+    async def async_flush(self) -> None:
+        """Write the snapshot of a pending delayed save now."""
+        if self._pending is not None:
+            # Store.async_save cancels the delayed save
+            await self._store.async_save(self._encode_pending())
+
+    async def async_remove(self) -> None:
+        """Cancel any pending save and delete the stored snapshot."""
+        self._pending = None
+        await self._store.async_remove()
@@ -0,0 +1,85 @@
+"""Per-transaction trace of the Modbus link in a fixed-size ring buffer."""
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import NamedTuple
+
+RESULT_OK = "ok"
+RESULT_EXCEPTION = "exception"  # device answered with a Modbus exception
+RESULT_TIMEOUT = "timeout"
+RESULT_ERROR = "error"  # not connected or transport failure
+RESULT_REJECTED = "rejected"  # circuit open, nothing sent
+
+# Who started the transaction (entity_id, "coordinator", ...); set by the caller's task
+trace_caller: ContextVar[str | None] = ContextVar("madelon_trace_caller", default=None)
+
+
+class TraceEntry(NamedTuple):
+    start: float  # time.monotonic()
+    end: float
+    unit_id: int
+    function: int
+    address: int
+    count: int
+    result: str
+    caller: str | None
+
+    def as_dict(self, wall_offset: float = 0.0) -> dict:
+        """Serializable form; ``wall_offset`` converts monotonic to epoch time."""
+        return {
+            "time": round(self.start + wall_offset, 6),
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "unit_id": self.unit_id,
+            "function": self.function,
+            "address": self.address,
+            "count": self.count,
+            "result": self.result,
+            "caller": self.caller,
+        }
+
+
+class TraceBuffer:
+    """Keep the last ``size`` transactions.
+
+    Slots are allocated once; recording is a tuple store and an index bump,
+    cheap enough to stay enabled in production.
+    """
+
+    __slots__ = ("size", "total", "_entries", "_next")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.total = 0
+        self._entries: list[TraceEntry | None] = [None] * size
+        self._next = 0
+
+    def record(
+        self,
+        start: float,
+        end: float,
+        unit_id: int,
+        function: int,
+        address: int,
+        count: int,
+        result: str,
+        caller: str | None,
+    ) -> None:
+        self._entries[self._next] = TraceEntry(start, end, unit_id, function, address, count, result, caller)
+        self._next += 1
+        if self._next == self.size:
+            self._next = 0
+        self.total += 1
+
+    def entries(self) -> list[TraceEntry]:
+        """Recorded transactions, oldest first."""
+        if self.total < self.size:
+            return self._entries[:self._next]
+        return self._entries[self._next:] + self._entries[:self._next]
+
+    @property
+    def overwritten(self) -> int:
+        """Transactions that no longer fit in the buffer."""
+        return max(0, self.total - self.size)
+
+    def __len__(self) -> int:
+        return min(self.total, self.size)
@@ -1,41 +1,12 @@
-import asyncio
-from pymodbus.server.async_io import StartAsyncTcpServer
-from pymodbus.device import ModbusDeviceIdentification
-from pymodbus.datastore import ModbusSequentialDataBlock
-from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext
-import logging
+"""Local Madelon gateway for development.
 
-# Configure logging
-logging.basicConfig()
-log = logging.getLogger()
-log.setLevel(logging.WARNING)
+Thin wrapper around the simulator package; accepts the same options, e.g.
 
-# # Set pymodbus logging level
-# pymodbus_log = logging.getLogger("pymodbus")
-# pymodbus_log.setLevel(logging.WARNING)
+    python dummy_server.py --units 1 2 --latency 0.05 --jitter 0.02 --drop-rate 0.01
 
-# Create a Modbus data store with some initial values
-store = ModbusSlaveContext(
-    hr=ModbusSequentialDataBlock(0, [0]*100)  # 100 holding registers initialized to 0
-)
-context = ModbusServerContext(slaves=store, single=True)
-
-# Set up server identity
-identity = ModbusDeviceIdentification()
-identity.VendorName = 'pymodbus'
-identity.ProductCode = 'PM'
-identity.VendorUrl = 'http://github.com/riptideio/pymodbus/'
-identity.ProductName = 'pymodbus Server'
-identity.ModelName = 'pymodbus Server'
-identity.MajorMinorRevision = '1.0'
-
-# Start the Modbus server
-async def run_server():
-    await StartAsyncTcpServer(
-        context=context,
-        identity=identity,
-        address=("localhost", 8899)
-    )
+See ``python -m simulator --help``.
+"""
+from simulator.__main__ import main
 
 if __name__ == "__main__":
-    asyncio.run(run_server())
+    main()
@@ -0,0 +1,17 @@
+"""Local simulator of Madelon units behind an RS485 Modbus TCP gateway."""
+from .device import MadelonDevice
+from .gateway import GatewayServer, GatewayStats
+from .loopback import LoopbackBus, LoopbackClient
+from .replay import ReplayGateway
+from .virtual_time import VirtualClock, VirtualTimeLoop
+
+__all__ = [
+    "GatewayServer",
+    "GatewayStats",
+    "LoopbackBus",
+    "LoopbackClient",
+    "MadelonDevice",
+    "ReplayGateway",
+    "VirtualClock",
+    "VirtualTimeLoop",
+]
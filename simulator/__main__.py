@@ -0,0 +1,79 @@
+"""Run the simulator: python -m simulator --units 1 2 --latency 0.05 --jitter 0.02
+
+Replay a capture from the start_capture service: python -m simulator --replay capture.bin
+"""
+import argparse
+import asyncio
+import logging
+import random
+
+from .device import MadelonDevice
+from .gateway import GatewayServer
+from .replay import ReplayGateway, load_capture_module
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m simulator", description="Simulated Madelon gateway")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--units", type=int, nargs="+", default=[1], help="slave ids on the bus")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per transaction")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds added to the latency")
+    parser.add_argument("--baudrate", type=int, default=None, help="add RS485 frame time, e.g. 9600")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="probability a request is lost")
+    parser.add_argument("--max-clients", type=int, default=1)
+    parser.add_argument("--ramp-time", type=float, default=4.0, help="seconds per fan speed step")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--replay", metavar="CAPTURE", help="answer from a start_capture file instead")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="scale recorded latencies")
+    parser.add_argument("--replay-loop", action="store_true", help="start over when a request runs out")
+    parser.add_argument("--verbose", action="store_true")
+    return parser
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    if args.replay:
+        records = load_capture_module().read_capture(args.replay)
+        logging.getLogger(__name__).info(f"Replaying {len(records)} transactions from {args.replay}")
+        gateway = ReplayGateway(
+            records,
+            speed=args.replay_speed,
+            loop=args.replay_loop,
+            max_clients=args.max_clients,
+            rng=rng,
+        )
+        await gateway.start(args.host, args.port)
+        async with gateway:
+            await gateway.serve_forever()
+        return
+
+    devices = {
+        unit_id: MadelonDevice(ramp_time=args.ramp_time, rng=random.Random(rng.random()))
+        for unit_id in args.units
+    }
+    gateway = GatewayServer(
+        devices,
+        latency=args.latency,
+        jitter=args.jitter,
+        baudrate=args.baudrate,
+        drop_rate=args.drop_rate,
+        max_clients=args.max_clients,
+        rng=rng,
+    )
+    await gateway.start(args.host, args.port)
+    async with gateway:
+        await gateway.serve_forever()
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
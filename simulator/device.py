@@ -0,0 +1,190 @@
+"""Behavioral model of one Madelon fresh air unit."""
+from __future__ import annotations
+
+import math
+import random
+import time
+
+# Holding register map, mirrors FreshAirSystem.REGISTERS
+POWER = 0
+MODE = 4
+SUPPLY_SPEED = 7
+EXHAUST_SPEED = 8
+BYPASS = 9
+ACTUAL_SUPPLY = 12
+ACTUAL_EXHAUST = 13
+TEMPERATURE = 16
+HUMIDITY = 17
+
+REGISTER_COUNT = 100
+
+MODE_MANUAL = 0
+MODE_AUTO = 1
+MODE_TIMER = 2
+
+# Allowed raw values per writable register; everything else is read-only
+WRITABLE = {
+    POWER: range(0, 2),
+    MODE: range(0, 3),
+    SUPPLY_SPEED: range(1, 4),
+    EXHAUST_SPEED: range(1, 4),
+    BYPASS: range(0, 2),
+}
+
+
+class DeviceError(Exception):
+    """A request the device answers with a Modbus exception code."""
+
+    ILLEGAL_ADDRESS = 0x02
+    ILLEGAL_VALUE = 0x03
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+class MadelonDevice:
+    """Register file plus the physics behind it.
+
+    The model advances lazily from the clock on every access, so no
+    background task is needed:
+
+    - actual_supply/actual_exhaust step one speed towards their target every
+      ``ramp_time`` seconds; the target is 0 while powered off.
+    - In AUTO mode the unit picks the fan speed from humidity and opens the
+      bypass itself (free cooling when the room is warm and outside is
+      cooler), overwriting the setpoint and bypass registers.
+    - Supply air temperature follows outdoor air with the bypass open and the
+      heat exchanger output otherwise; humidity is pulled down by airflow.
+      Both carry random-walk noise.
+    """
+
+    def __init__(
+        self,
+        ramp_time: float = 4.0,
+        indoor_temperature: float = 21.0,
+        outdoor_temperature: float = 8.0,
+        base_humidity: float = 60.0,
+        recovery_efficiency: float = 0.75,
+        comfort_temperature: float = 23.0,
+        noise: float = 1.0,
+        clock=time.monotonic,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.ramp_time = ramp_time
+        self.indoor_temperature = indoor_temperature
+        self.outdoor_temperature = outdoor_temperature
+        self.base_humidity = base_humidity
+        self.recovery_efficiency = recovery_efficiency
+        self.comfort_temperature = comfort_temperature
+        self.noise = noise
+        self._clock = clock
+        self._rng = rng or random.Random()
+
+        self.registers = [0] * REGISTER_COUNT
+        self.registers[MODE] = MODE_MANUAL
+        self.registers[SUPPLY_SPEED] = 1
+        self.registers[EXHAUST_SPEED] = 1
+        self._temperature = indoor_temperature
+        self._humidity = base_humidity
+        self._ramp_elapsed = {ACTUAL_SUPPLY: 0.0, ACTUAL_EXHAUST: 0.0}
+        self._last_tick = clock()
+        self._store_measurements()
+
+    # Register access
+
+    def read(self, address: int, count: int) -> list[int]:
+        """Return ``count`` registers starting at ``address``."""
+        self._check_range(address, count)
+        self.tick()
+        return self.registers[address:address + count]
+
+    def write(self, address: int, values: list[int]) -> None:
+        """Write a contiguous run; all values are validated before any is stored."""
+        self._check_range(address, len(values))
+        for offset, value in enumerate(values):
+            register = address + offset
+            if register not in WRITABLE:
+                raise DeviceError(DeviceError.ILLEGAL_ADDRESS, f"Register {register} is read-only")
+            if value not in WRITABLE[register]:
+                raise DeviceError(DeviceError.ILLEGAL_VALUE, f"Value {value} out of range for register {register}")
+        self.tick()
+        self.registers[address:address + len(values)] = values
+        self._apply_auto()
+
+    @staticmethod
+    def _check_range(address: int, count: int) -> None:
+        if address < 0 or count < 1 or address + count > REGISTER_COUNT:
+            raise DeviceError(DeviceError.ILLEGAL_ADDRESS, f"Registers {address}..{address + count - 1} out of range")
+
+    # Model
+
+    def tick(self) -> None:
+        """Advance the model to the current clock time."""
+        now = self._clock()
+        dt = max(0.0, now - self._last_tick)
+        self._last_tick = now
+        if dt == 0:
+            return
+        self._apply_auto()
+        self._ramp(ACTUAL_SUPPLY, SUPPLY_SPEED, dt)
+        self._ramp(ACTUAL_EXHAUST, EXHAUST_SPEED, dt)
+        self._drift(dt)
+        self._store_measurements()
+
+    def _apply_auto(self) -> None:
+        if self.registers[MODE] != MODE_AUTO:
+            return
+        if self._humidity >= 70:
+            speed = 3
+        elif self._humidity >= 55:
+            speed = 2
+        else:
+            speed = 1
+        self.registers[SUPPLY_SPEED] = self.registers[EXHAUST_SPEED] = speed
+        free_cooling = (
+            self._temperature > self.comfort_temperature
+            and self.outdoor_temperature < self._temperature
+        )
+        self.registers[BYPASS] = int(free_cooling)
+
+    def _ramp(self, actual: int, setpoint: int, dt: float) -> None:
+        target = self.registers[setpoint] if self.registers[POWER] else 0
+        if self.registers[actual] == target:
+            self._ramp_elapsed[actual] = 0.0
+            return
+        self._ramp_elapsed[actual] += dt
+        while self._ramp_elapsed[actual] >= self.ramp_time and self.registers[actual] != target:
+            self._ramp_elapsed[actual] -= self.ramp_time
+            self.registers[actual] += 1 if target > self.registers[actual] else -1
+        if self.registers[actual] == target:
+            self._ramp_elapsed[actual] = 0.0
+
+    def _drift(self, dt: float) -> None:
+        airflow = self.registers[ACTUAL_SUPPLY]
+        if airflow == 0:
+            # Stagnant duct settles to room temperature
+            temperature_target = self.indoor_temperature
+        elif self.registers[BYPASS]:
+            temperature_target = self.outdoor_temperature
+        else:
+            efficiency = self.recovery_efficiency
+            temperature_target = efficiency * self.indoor_temperature + (1 - efficiency) * self.outdoor_temperature
+        humidity_target = self.base_humidity - 6.0 * airflow
+        # Faster fans reach the new equilibrium sooner
+        tau = 180.0 / (1 + airflow)
+        blend = 1 - math.exp(-dt / tau)
+        scale = self.noise * math.sqrt(dt)
+        self._temperature += (temperature_target - self._temperature) * blend + self._rng.gauss(0, 0.02) * scale
+        self._humidity += (humidity_target - self._humidity) * blend + self._rng.gauss(0, 0.1) * scale
+        self._humidity = min(100.0, max(0.0, self._humidity))
+
+    @property
+    def supply_temperature(self) -> float:
+        """Current supply air temperature (°C), before it is stored in tenths."""
+        return self._temperature
+
+    def _store_measurements(self) -> None:
+        # Both in tenths; temperature is signed 16-bit two's complement
+        self.registers[TEMPERATURE] = round(self._temperature * 10) & 0xFFFF
+        self.registers[HUMIDITY] = round(self._humidity * 10)
@@ -0,0 +1,208 @@
+"""Modbus TCP to RS485 gateway emulation.
+
+Cheap WiFi/Ethernet bridges (USR-TCP232, Elfin EW11, ...) in front of the
+Madelon units behave quite differently from a Modbus TCP server:
+
+- one RS485 bus: requests from any connection are answered strictly one at a
+  time, each taking the serial frame time plus the device turnaround;
+- replies arrive with noticeable latency and jitter over WiFi;
+- frames get lost, and a lost or unanswered frame produces no reply at all,
+  so the client only sees its own timeout;
+- most accept a single TCP client and refuse the rest;
+- several units with different slave ids share the bus.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import logging
+import random
+import struct
+
+from .device import DeviceError, MadelonDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+READ_HOLDING_REGISTERS = 0x03
+WRITE_SINGLE_REGISTER = 0x06
+WRITE_MULTIPLE_REGISTERS = 0x10
+
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_VALUE = 0x03
+
+MAX_READ_COUNT = 125
+MAX_WRITE_COUNT = 123
+
+# MBAP header: transaction id, protocol id, length, unit id
+_MBAP = struct.Struct(">HHHB")
+# 8N1 plus start bit, and the RTU CRC + unit id the gateway adds on the bus
+_BITS_PER_BYTE = 10
+_RTU_OVERHEAD = 3
+
+
+@dataclass
+class GatewayStats:
+    """Counters for benchmarks; ``transactions`` counts frames put on the bus."""
+
+    connections: int = 0
+    rejected_connections: int = 0
+    transactions: int = 0
+    dropped: int = 0
+    unanswered: int = 0
+    exceptions: int = 0
+    bus_time: float = 0.0
+    by_function: dict[int, int] = field(default_factory=dict)
+
+    def reset(self) -> None:
+        self.__init__()
+
+
+class GatewayServer:
+    """Serve a set of MadelonDevice instances behind one emulated gateway.
+
+    ``latency`` and ``jitter`` are seconds added to every transaction,
+    ``baudrate`` adds the serial frame time (None disables it), ``drop_rate``
+    is the probability a request is silently lost and ``max_clients`` the
+    number of concurrent TCP connections accepted.
+    """
+
+    def __init__(
+        self,
+        devices: dict[int, MadelonDevice],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        baudrate: int | None = None,
+        drop_rate: float = 0.0,
+        max_clients: int = 1,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.devices = devices
+        self.latency = latency
+        self.jitter = jitter
+        self.baudrate = baudrate
+        self.drop_rate = drop_rate
+        self.max_clients = max_clients
+        self.stats = GatewayStats()
+        self._rng = rng or random.Random()
+        self._bus = asyncio.Lock()
+        self._clients: set[asyncio.StreamWriter] = set()
+        self._handlers: set[asyncio.Task] = set()
+        self._server: asyncio.base_events.Server | None = None
+
+    async def start(self, host: str = "localhost", port: int = 8899) -> None:
+        """Start listening; port 0 picks a free port (see ``port``)."""
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        _LOGGER.info(f"Gateway listening on {host}:{self.port} for units {sorted(self.devices)}")
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._clients):
+            writer.close()
+        # Let connection handlers see EOF and finish instead of being cancelled
+        if self._handlers:
+            await asyncio.wait(self._handlers)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def __aenter__(self) -> GatewayServer:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        task.add_done_callback(self._handlers.discard)
+        if len(self._clients) >= self.max_clients:
+            # Like the real bridges: accept, then drop the socket right away
+            self.stats.rejected_connections += 1
+            _LOGGER.debug("Rejecting extra client, gateway is busy")
+            writer.close()
+            return
+        self.stats.connections += 1
+        self._clients.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(_MBAP.size)
+                transaction_id, protocol_id, length, unit_id = _MBAP.unpack(header)
+                pdu = await reader.readexactly(length - 1)
+                if protocol_id != 0:
+                    continue
+                response = await self._transact(unit_id, pdu)
+                if response is None:
+                    continue
+                writer.write(_MBAP.pack(transaction_id, 0, len(response) + 1, unit_id) + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _transact(self, unit_id: int, pdu: bytes) -> bytes | None:
+        """Run one request on the serial bus; None means no reply is sent."""
+        async with self._bus:
+            self.stats.transactions += 1
+            self.stats.by_function[pdu[0]] = self.stats.by_function.get(pdu[0], 0) + 1
+            device = self.devices.get(unit_id)
+            response = self._dispatch(device, pdu) if device is not None else None
+            delay = self._bus_delay(len(pdu), len(response) if response else 0)
+            self.stats.bus_time += delay
+            if delay:
+                await asyncio.sleep(delay)
+            if device is None:
+                self.stats.unanswered += 1
+                return None
+            if self.drop_rate and self._rng.random() < self.drop_rate:
+                self.stats.dropped += 1
+                return None
+            return response
+
+    def _bus_delay(self, request_size: int, response_size: int) -> float:
+        delay = self.latency
+        if self.jitter:
+            delay += self._rng.uniform(-self.jitter, self.jitter)
+        if self.baudrate:
+            frame_bytes = request_size + response_size + 2 * _RTU_OVERHEAD
+            delay += frame_bytes * _BITS_PER_BYTE / self.baudrate
+        return max(0.0, delay)
+
+    def _dispatch(self, device: MadelonDevice, pdu: bytes) -> bytes:
+        function = pdu[0]
+        try:
+            if function == READ_HOLDING_REGISTERS:
+                address, count = struct.unpack(">HH", pdu[1:5])
+                if not 1 <= count <= MAX_READ_COUNT:
+                    return self._exception(function, ILLEGAL_VALUE)
+                values = device.read(address, count)
+                return struct.pack(f">BB{count}H", function, 2 * count, *values)
+            if function == WRITE_SINGLE_REGISTER:
+                address, value = struct.unpack(">HH", pdu[1:5])
+                device.write(address, [value])
+                return pdu[:5]
+            if function == WRITE_MULTIPLE_REGISTERS:
+                address, count, byte_count = struct.unpack(">HHB", pdu[1:6])
+                if not 1 <= count <= MAX_WRITE_COUNT or byte_count != 2 * count:
+                    return self._exception(function, ILLEGAL_VALUE)
+                device.write(address, list(struct.unpack(f">{count}H", pdu[6:6 + byte_count])))
+                return pdu[:5]
+        except DeviceError as err:
+            _LOGGER.debug(f"Device rejected request: {err}")
+            return self._exception(function, err.code)
+        except struct.error:
+            return self._exception(function, ILLEGAL_VALUE)
+        return self._exception(function, ILLEGAL_FUNCTION)
+
+    def _exception(self, function: int, code: int) -> bytes:
+        self.stats.exceptions += 1
+        return bytes((function | 0x80, code))
@@ -0,0 +1,109 @@
+"""In-memory stand-in for pymodbus' AsyncModbusTcpClient.
+
+Requests go straight to MadelonDevice instances, with gateway latency,
+jitter and outage windows applied through asyncio.sleep, so they work on
+simulated time (see virtual_time.py).
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+
+from pymodbus.exceptions import ModbusIOException
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.register_read_message import ReadHoldingRegistersResponse
+from pymodbus.register_write_message import (
+    WriteMultipleRegistersResponse,
+    WriteSingleRegisterResponse,
+)
+
+from .device import DeviceError, MadelonDevice
+
+
+class LoopbackBus:
+    """Devices behind one emulated gateway, shared by its loopback clients.
+
+    ``outages`` is a list of (start, end) windows in clock seconds during
+    which the gateway is unreachable: connects fail and requests time out.
+    """
+
+    def __init__(
+        self,
+        devices: dict[int, MadelonDevice],
+        latency: float = 0.03,
+        jitter: float = 0.01,
+        outages=(),
+        clock=time.monotonic,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.devices = devices
+        self.latency = latency
+        self.jitter = jitter
+        self.outages = list(outages)
+        self.transactions = 0
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = asyncio.Lock()
+
+    def is_down(self) -> bool:
+        now = self._clock()
+        return any(start <= now < end for start, end in self.outages)
+
+    def client(self, timeout: float = 3, retries: int = 3) -> LoopbackClient:
+        return LoopbackClient(self, timeout, retries)
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+
+class LoopbackClient:
+    """The subset of AsyncModbusTcpClient that ModbusClient uses."""
+
+    def __init__(self, bus: LoopbackBus, timeout: float, retries: int) -> None:
+        self._bus = bus
+        self._timeout = timeout
+        self._retries = retries
+        self.connected = False
+
+    async def connect(self) -> bool:
+        await asyncio.sleep(self._bus._delay())
+        self.connected = not self._bus.is_down()
+        return self.connected
+
+    def close(self) -> None:
+        self.connected = False
+
+    async def read_holding_registers(self, address, count, slave):
+        return await self._transact(slave, 0x03, lambda device: ReadHoldingRegistersResponse(device.read(address, count)))
+
+    async def write_register(self, address, value, slave):
+        def write(device):
+            device.write(address, [value])
+            return WriteSingleRegisterResponse(address, value)
+
+        return await self._transact(slave, 0x06, write)
+
+    async def write_registers(self, address, values, slave):
+        def write(device):
+            device.write(address, list(values))
+            return WriteMultipleRegistersResponse(address, len(values))
+
+        return await self._transact(slave, 0x10, write)
+
+    async def _transact(self, slave, function, handler):
+        bus = self._bus
+        async with bus._lock:
+            bus.transactions += 1
+            device = bus.devices.get(slave)
+            if bus.is_down() or device is None:
+                # pymodbus resends up to ``retries`` times before giving up
+                await asyncio.sleep(self._timeout * (self._retries + 1))
+                if bus.is_down():
+                    self.connected = False
+                raise ModbusIOException("No response received (loopback)")
+            await asyncio.sleep(bus._delay())
+            try:
+                return handler(device)
+            except DeviceError as err:
+                return ExceptionResponse(function, err.code)
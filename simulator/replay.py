@@ -0,0 +1,142 @@
+"""Answer Modbus requests from a capture file made with the start_capture service."""
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+import importlib.util
+import logging
+import pathlib
+import random
+import struct
+import sys
+
+from .device import REGISTER_COUNT
+from .gateway import (
+    READ_HOLDING_REGISTERS,
+    WRITE_MULTIPLE_REGISTERS,
+    WRITE_SINGLE_REGISTER,
+    GatewayServer,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_CAPTURE_MODULE = (
+    pathlib.Path(__file__).resolve().parents[1]
+    / "custom_components" / "madelon_ventilation" / "capture.py"
+)
+
+
+def load_capture_module():
+    """Import the integration's capture format without its Home Assistant package."""
+    if "madelon_capture" in sys.modules:
+        return sys.modules["madelon_capture"]
+    spec = importlib.util.spec_from_file_location("madelon_capture", _CAPTURE_MODULE)
+    module = importlib.util.module_from_spec(spec)
+    # dataclasses looks the module up in sys.modules while creating the classes
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class ReplayGateway(GatewayServer):
+    """Gateway that answers from recorded transactions.
+
+    A request is matched with the next unused record for the same unit,
+    function, address and count, and answered with its recorded result
+    after its recorded latency (timeouts and transport errors get no reply).
+    Requests the capture does not contain, e.g. after the read planner
+    changed, are answered from the register values seen so far with a
+    latency sampled from the recorded ones.
+    """
+
+    def __init__(
+        self,
+        records,
+        speed: float = 1.0,
+        loop: bool = False,
+        max_clients: int = 1,
+        rng: random.Random | None = None,
+    ) -> None:
+        super().__init__({}, max_clients=max_clients, rng=rng)
+        self.speed = speed
+        self.loop = loop
+        self.matched = 0
+        self.unmatched = 0
+        self._records = defaultdict(list)
+        self._positions = defaultdict(int)
+        self._latencies = defaultdict(list)
+        self._images: dict[int, list[int]] = {}
+        for record in records:
+            self._records[(record.unit_id, record.function, record.address, record.count)].append(record)
+            if record.result == "ok":
+                self._latencies[record.function].append(record.latency)
+            if record.registers:
+                # Start from the first value seen for every register
+                image = self._image(record.unit_id)
+                for offset, value in enumerate(record.registers):
+                    if image[record.address + offset] is None:
+                        image[record.address + offset] = value
+        for image in self._images.values():
+            image[:] = [0 if value is None else value for value in image]
+
+    def _image(self, unit_id: int) -> list:
+        if unit_id not in self._images:
+            self._images[unit_id] = [None] * REGISTER_COUNT
+        return self._images[unit_id]
+
+    def _next_record(self, key):
+        records = self._records.get(key)
+        if not records:
+            return None
+        position = self._positions[key]
+        if position >= len(records):
+            if not self.loop:
+                return None
+            position = 0
+        self._positions[key] = position + 1
+        return records[position]
+
+    async def _transact(self, unit_id: int, pdu: bytes) -> bytes | None:
+        function = pdu[0]
+        address, count = struct.unpack(">HH", pdu[1:5])
+        if function == WRITE_SINGLE_REGISTER:
+            values, count = [count], 1
+        elif function == WRITE_MULTIPLE_REGISTERS:
+            values = list(struct.unpack(f">{count}H", pdu[6:6 + 2 * count]))
+        else:
+            values = None
+
+        async with self._bus:
+            self.stats.transactions += 1
+            self.stats.by_function[function] = self.stats.by_function.get(function, 0) + 1
+            record = self._next_record((unit_id, function, address, count))
+            if record is not None:
+                self.matched += 1
+                latency = record.latency
+            else:
+                self.unmatched += 1
+                recorded = self._latencies.get(function)
+                latency = self._rng.choice(recorded) if recorded else 0.0
+            latency *= self.speed
+            self.stats.bus_time += latency
+            if latency:
+                await asyncio.sleep(latency)
+
+            if record is not None and record.result in ("timeout", "error"):
+                self.stats.unanswered += 1
+                return None
+            if record is not None and record.result == "exception":
+                return self._exception(function, record.exception_code)
+            if unit_id not in self._images and record is None:
+                self.stats.unanswered += 1
+                return None
+            image = self._image(unit_id)
+            if values is not None:
+                image[address:address + count] = values
+                return pdu[:5]
+            if function != READ_HOLDING_REGISTERS:
+                return self._exception(function, 0x01)
+            if record is not None and len(record.registers) == count:
+                image[address:address + count] = record.registers
+            registers = [value or 0 for value in image[address:address + count]]
+            return struct.pack(f">BB{count}H", function, 2 * count, *registers)
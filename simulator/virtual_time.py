@@ -0,0 +1,80 @@
+"""Run asyncio code on simulated time.
+
+VirtualTimeLoop reads the time from a VirtualClock and, whenever nothing is
+ready to run, jumps the clock straight to the next scheduled timer instead
+of waiting. asyncio.sleep, wait_for timeouts and call_later all follow the
+virtual clock, so hours of polling run in seconds of CPU time.
+
+Only in-memory transports (see loopback.py) work on this loop: real socket
+I/O would not be waited for.
+"""
+from __future__ import annotations
+
+import asyncio
+import selectors
+
+
+class VirtualClock:
+    """Clock whose time only moves when advanced; matches the controller's Clock."""
+
+    def __init__(self, start: float = 0.0, epoch: float = 1_700_000_000.0) -> None:
+        self._now = start
+        self._epoch = epoch
+
+    def time(self) -> float:
+        return self._epoch + self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        if seconds > 0:
+            self._now += seconds
+
+
+class _FastForwardSelector:
+    """Selector that advances the clock instead of blocking for a timeout."""
+
+    def __init__(self, clock: VirtualClock) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._clock = clock
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events:
+            return events
+        if timeout is None:
+            # No timers at all: only another thread can wake us up
+            return self._selector.select(None)
+        self._clock.advance(timeout)
+        return []
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock: VirtualClock) -> None:
+        self.clock = clock
+        super().__init__(_FastForwardSelector(clock))
+
+    def time(self) -> float:
+        return self.clock.monotonic()
+
+
+def run(main, clock: VirtualClock):
+    """asyncio.run() on virtual time."""
+    loop = VirtualTimeLoop(clock)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
@@ -0,0 +1,58 @@
+"""Import the integration's transport modules without Home Assistant.
+
+fresh_air_controller, hub, planner, snapshot, ... only need pymodbus; the
+package __init__ pulls in Home Assistant, so load() bypasses it.
+
+Tools that need the real entry lifecycle (setup, platforms, coordinator,
+unload) use async_home_assistant() instead; it needs homeassistant
+installed, and the two cannot be mixed in one process.
+"""
+import contextlib
+import importlib
+import os
+import pathlib
+import sys
+import tempfile
+import types
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+PACKAGE = "custom_components.madelon_ventilation"
+
+
+def load(name):
+    """Return custom_components.madelon_ventilation.<name>."""
+    if PACKAGE not in sys.modules:
+        for package, path in (
+            ("custom_components", ROOT / "custom_components"),
+            (PACKAGE, ROOT / "custom_components" / "madelon_ventilation"),
+        ):
+            module = types.ModuleType(package)
+            module.__path__ = [str(path)]
+            sys.modules[package] = module
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+@contextlib.asynccontextmanager
+async def async_home_assistant():
+    """A running Home Assistant with this repo's integration, in a temporary config directory."""
+    from homeassistant import bootstrap, loader
+    from homeassistant.config_entries import ConfigEntries
+    from homeassistant.core import HomeAssistant
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.symlink(ROOT / "custom_components", os.path.join(config_dir, "custom_components"))
+        # Home Assistant imports custom integrations as custom_components.<domain>
+        sys.path.insert(0, config_dir)
+        hass = HomeAssistant(config_dir)
+        try:
+            # Requirements (pymodbus) come from the environment, not from pip at runtime
+            hass.config.skip_pip = True
+            loader.async_setup(hass)
+            hass.config_entries = ConfigEntries(hass, {})
+            # Registries, translations and config entries, like bootstrap does
+            await bootstrap.async_load_base_functionality(hass)
+            await hass.async_start()
+            yield hass
+        finally:
+            await hass.async_stop(force=True)
+            sys.path.remove(config_dir)
@@ -0,0 +1,382 @@
+"""Transport benchmarks against an in-process simulated gateway.
+
+Scenarios:
+
+- ``read``: block read latency (one full poll of a unit), p50/p99
+- ``write``: fan set_percentage end to end (power + both speeds in one apply)
+- ``fanout``: Modbus transactions per poll for 1..N entities subscribed
+- ``devices``: one poll cycle of 1/10/50 units, all on one gateway (one RS485
+  bus) and each behind its own gateway
+- ``contention``: write latency while other units on the same gateway poll
+  back to back
+- ``concurrency``: many callers of async_read_all_registers at once; fails
+  unless each flight costs one bus transaction per span and every caller of
+  a flight sees the same snapshot
+
+Results are written as JSON; ``--compare`` checks them against an earlier run.
+
+    python tools/benchmark.py --output bench.json
+    python tools/benchmark.py --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from _integration import ROOT, load
+
+sys.path.insert(0, str(ROOT))
+from simulator import GatewayServer, MadelonDevice  # noqa: E402
+
+controller = load("fresh_air_controller")
+hub_module = load("hub")
+
+HOST = "127.0.0.1"
+
+# Registers each platform entity subscribes to, in the order they are created
+ENTITY_REGISTERS = [
+    ("power", "supply_speed", "exhaust_speed"),  # fan
+    ("temperature",),
+    ("humidity",),
+    ("supply_speed",),
+    ("exhaust_speed",),
+    ("mode",),  # auto mode switch
+    ("bypass",),
+]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds."""
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(percentile(0.50), 3),
+        "p99_ms": round(percentile(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+
+    def gateway(self, units):
+        devices = {unit_id: MadelonDevice(rng=random.Random(self.rng.random())) for unit_id in units}
+        return GatewayServer(
+            devices,
+            latency=self.args.latency,
+            jitter=self.args.jitter,
+            baudrate=self.args.baudrate,
+            rng=random.Random(self.rng.random()),
+        )
+
+    async def run_read(self):
+        async with self.gateway([1]) as gateway:
+            await gateway.start(HOST, 0)
+            system = controller.FreshAirSystem(HOST, gateway.port, 1)
+            for entity in ENTITY_REGISTERS:
+                system.subscribe(entity)
+            samples = []
+            for _ in range(self.args.iterations):
+                start = time.perf_counter()
+                if not await system.async_read_all_registers(force_refresh=True):
+                    raise RuntimeError("Block read failed")
+                samples.append(time.perf_counter() - start)
+            spans = len(system.read_plan)
+            system.close()
+            system.modbus.close()
+        return {**summarize(samples), "spans": spans}
+
+    async def run_write(self):
+        async with self.gateway([1]) as gateway:
+            await gateway.start(HOST, 0)
+            system = controller.FreshAirSystem(HOST, gateway.port, 1)
+            await system.async_read_all_registers(force_refresh=True)
+            gateway.stats.reset()
+            samples = []
+            for index in range(self.args.iterations):
+                speed = index % 3 + 1
+                # Same batch as FreshAirFan.async_set_percentage
+                values = {"power": True, "supply_speed": speed, "exhaust_speed": speed}
+                start = time.perf_counter()
+                if not await system.apply(values):
+                    raise RuntimeError("Write failed")
+                samples.append(time.perf_counter() - start)
+            transactions = gateway.stats.transactions
+            system.close()
+            system.modbus.close()
+        return {**summarize(samples), "transactions_per_call": round(transactions / len(samples), 3)}
+
+    async def run_fanout(self):
+        results = []
+        async with self.gateway([1]) as gateway:
+            await gateway.start(HOST, 0)
+            for entities in range(1, len(ENTITY_REGISTERS) + 1):
+                system = controller.FreshAirSystem(HOST, gateway.port, 1)
+                for registers in ENTITY_REGISTERS[:entities]:
+                    system.subscribe(registers)
+                await system.async_read_all_registers(force_refresh=True)
+                gateway.stats.reset()
+                polls = max(1, self.args.iterations // 10)
+                for _ in range(polls):
+                    await system.async_read_all_registers(force_refresh=True)
+                results.append({
+                    "entities": entities,
+                    "transactions_per_poll": round(gateway.stats.transactions / polls, 3),
+                    "registers_per_poll": sum(span.count for span in system.read_plan),
+                })
+                system.close()
+                system.modbus.close()
+        return results
+
+    async def poll_cycle(self, systems):
+        """Poll every unit concurrently, as their coordinators would."""
+
+        async def poll(system):
+            start = time.perf_counter()
+            ok = await system.async_read_all_registers(force_refresh=True)
+            return ok, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(poll(system) for system in systems))
+        return time.perf_counter() - start, results
+
+    async def run_devices_shared(self, count):
+        units = list(range(1, count + 1))
+        async with self.gateway(units) as gateway:
+            await gateway.start(HOST, 0)
+            hub = hub_module.ModbusHub()
+            systems = [
+                controller.FreshAirSystem(HOST, gateway.port, unit, modbus=hub.acquire(HOST, gateway.port))
+                for unit in units
+            ]
+            result = await self._cycles(systems, [gateway])
+            for system in systems:
+                system.close()
+                hub.release(HOST, gateway.port)
+        return result
+
+    async def run_devices_separate(self, count):
+        gateways = [self.gateway([1]) for _ in range(count)]
+        for gateway in gateways:
+            await gateway.start(HOST, 0)
+        systems = [controller.FreshAirSystem(HOST, gateway.port, 1) for gateway in gateways]
+        try:
+            return await self._cycles(systems, gateways)
+        finally:
+            for system in systems:
+                system.close()
+                system.modbus.close()
+            for gateway in gateways:
+                await gateway.close()
+
+    async def _cycles(self, systems, gateways):
+        # First cycle opens the connections and is not measured
+        await self.poll_cycle(systems)
+        for gateway in gateways:
+            gateway.stats.reset()
+        cycle_times, device_times, failures = [], [], 0
+        for _ in range(self.args.cycles):
+            elapsed, results = await self.poll_cycle(systems)
+            cycle_times.append(elapsed)
+            for ok, duration in results:
+                device_times.append(duration)
+                failures += not ok
+        return {
+            "cycle": summarize(cycle_times),
+            "device": summarize(device_times),
+            "failures": failures,
+            "transactions_per_cycle": round(
+                sum(gateway.stats.transactions for gateway in gateways) / self.args.cycles, 3
+            ),
+        }
+
+    async def run_devices(self):
+        results = []
+        for count in self.args.devices:
+            results.append({
+                "devices": count,
+                "shared_gateway": await self.run_devices_shared(count),
+                "separate_gateways": await self.run_devices_separate(count),
+            })
+        return results
+
+
+    async def run_contention(self):
+        units = list(range(1, self.args.contention_units + 1))
+        async with self.gateway(units) as gateway:
+            await gateway.start(HOST, 0)
+            hub = hub_module.ModbusHub()
+            systems = [
+                controller.FreshAirSystem(HOST, gateway.port, unit, modbus=hub.acquire(HOST, gateway.port))
+                for unit in units
+            ]
+
+            async def poll_forever(system):
+                while True:
+                    await system.async_read_all_registers(force_refresh=True)
+
+            pollers = [asyncio.create_task(poll_forever(system)) for system in systems[1:]]
+            await asyncio.sleep(0.5)
+            samples = []
+            for index in range(max(1, self.args.iterations // 4)):
+                speed = index % 3 + 1
+                start = time.perf_counter()
+                await systems[0].apply({"supply_speed": speed, "exhaust_speed": speed})
+                samples.append(time.perf_counter() - start)
+                await asyncio.sleep(self.rng.uniform(0, 0.1))
+            for task in pollers:
+                task.cancel()
+            await asyncio.gather(*pollers, return_exceptions=True)
+            for system in systems:
+                system.close()
+                hub.release(HOST, gateway.port)
+        return {"polling_units": len(units) - 1, **summarize(samples)}
+
+    async def run_concurrency(self):
+        async with self.gateway([1]) as gateway:
+            await gateway.start(HOST, 0)
+            system = controller.FreshAirSystem(HOST, gateway.port, 1)
+            try:
+                await system.async_read_all_registers(force_refresh=True)
+                spans = len(system.plan_for(tuple(system.REGISTER_GROUPS)))
+                gateway.stats.reset()
+                samples = []
+
+                async def caller():
+                    # Join the flight at different points, before its first reply
+                    for _ in range(self.rng.randrange(4)):
+                        await asyncio.sleep(0)
+                    start = time.perf_counter()
+                    ok = await system.async_read_all_registers(force_refresh=True)
+                    samples.append(time.perf_counter() - start)
+                    return ok, system.registers
+
+                flights = max(1, self.args.iterations // 10)
+                for _ in range(flights):
+                    results = await asyncio.gather(*(caller() for _ in range(self.args.callers)))
+                    if not all(ok for ok, _ in results):
+                        raise RuntimeError("Concurrent read failed")
+                    snapshots = {id(snapshot) for _, snapshot in results}
+                    if len(snapshots) != 1:
+                        raise RuntimeError(f"Callers of one flight saw {len(snapshots)} snapshots")
+                transactions = gateway.stats.transactions
+                if transactions != spans * flights:
+                    raise RuntimeError(
+                        f"{transactions} transactions for {flights} flights of {spans} spans"
+                    )
+            finally:
+                system.close()
+                system.modbus.close()
+        return {
+            "callers": self.args.callers,
+            "flights": flights,
+            "transactions_per_flight": round(transactions / flights, 3),
+            **summarize(samples),
+        }
+
+
+SCENARIOS = {
+    "read": Bench.run_read,
+    "write": Bench.run_write,
+    "fanout": Bench.run_fanout,
+    "devices": Bench.run_devices,
+    "contention": Bench.run_contention,
+    "concurrency": Bench.run_concurrency,
+}
+
+
+def metadata(args):
+    import pymodbus
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "pymodbus": pymodbus.__version__,
+        "platform": platform.platform(),
+        "gateway": {"latency": args.latency, "jitter": args.jitter, "baudrate": args.baudrate},
+        "iterations": args.iterations,
+        "cycles": args.cycles,
+        "seed": args.seed,
+    }
+
+
+def flatten(value, prefix=""):
+    """Yield (path, number) for every latency/transaction figure in a result."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for item in value:
+            label = item.get("entities", item.get("devices")) if isinstance(item, dict) else None
+            yield from flatten(item, f"{prefix}[{label}]")
+    elif isinstance(value, (int, float)) and prefix.endswith(
+        ("_ms", "_per_poll", "_per_call", "_per_cycle", "_per_flight")
+    ):
+        yield prefix, value
+
+
+def compare(baseline, current, tolerance):
+    """Return the figures that got worse by more than ``tolerance`` (a fraction)."""
+    old = dict(flatten(baseline["results"]))
+    regressions = []
+    for path, value in flatten(current["results"]):
+        if path in old and old[path] > 0 and value > old[path] * (1 + tolerance):
+            regressions.append(f"{path}: {old[path]} -> {value}")
+    return regressions
+
+
+async def main(args):
+    bench = Bench(args)
+    results = {}
+    for name in args.scenarios:
+        start = time.perf_counter()
+        results[name] = await SCENARIOS[name](bench)
+        print(f"{name}: done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return {"meta": metadata(args), "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--iterations", type=int, default=200, help="samples for read and write")
+    parser.add_argument("--cycles", type=int, default=20, help="poll cycles per device count")
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--contention-units", type=int, default=10, help="units on the gateway for contention")
+    parser.add_argument("--callers", type=int, default=50, help="concurrent readers per flight for concurrency")
+    parser.add_argument("--latency", type=float, default=0.02, help="gateway latency per transaction (s)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON result to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown for --compare")
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,84 @@
+"""Capture -> replay smoke run.
+
+Records a short session (polls, a write and its read-back) against an
+in-process simulated gateway with ModbusClient.start_capture, then runs the
+same session against simulator.ReplayGateway serving that capture and checks
+that every request was answered from the capture and both sessions ended with
+the same snapshot.
+
+    python tools/replay_check.py
+"""
+import argparse
+import asyncio
+import pathlib
+import random
+import sys
+import tempfile
+
+from _integration import ROOT, load
+
+sys.path.insert(0, str(ROOT))
+from simulator import GatewayServer, MadelonDevice, ReplayGateway  # noqa: E402
+from simulator.replay import load_capture_module  # noqa: E402
+
+controller = load("fresh_air_controller")
+
+
+async def session(port, polls, capture=None):
+    """Poll, write, wait for the read-back, poll again; return the last snapshot."""
+    system = controller.FreshAirSystem("localhost", port)
+    try:
+        if capture is not None:
+            await system.modbus.start_capture(capture)
+        for _ in range(polls):
+            if not await system.async_read_all_registers(force_refresh=True):
+                raise RuntimeError("Read failed")
+        if not await system.apply({"power": True, "supply_speed": 3, "exhaust_speed": 3}):
+            raise RuntimeError("Write failed")
+        if system.confirmation is not None:
+            await system.confirmation
+        if not await system.async_read_all_registers(force_refresh=True):
+            raise RuntimeError("Read failed")
+        if capture is not None:
+            await system.modbus.stop_capture()
+        return system.registers.as_dict()
+    finally:
+        system.close()
+        system.modbus.close()
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(pathlib.Path(directory) / "session.bin")
+
+        device = MadelonDevice(rng=random.Random(args.seed))
+        gateway = GatewayServer({1: device}, latency=args.latency, rng=random.Random(args.seed))
+        await gateway.start("localhost", 0)
+        async with gateway:
+            recorded = await session(gateway.port, args.polls, capture=path)
+
+        records = load_capture_module().read_capture(path)
+        replay = ReplayGateway(records)
+        await replay.start("localhost", 0)
+        async with replay:
+            replayed = await session(replay.port, args.polls)
+
+    print(f"records {len(records)}, matched {replay.matched}, unmatched {replay.unmatched}")
+    failures = []
+    if replay.matched != len(records) or replay.unmatched:
+        failures.append("replay did not answer every request from the capture")
+    if replayed != recorded:
+        failures.append(f"snapshots differ:\n  recorded {recorded}\n  replayed {replayed}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK: replay matches the capture")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polls", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,234 @@
+"""Polling scenario on simulated time.
+
+Runs the controller (FreshAirSystem, ModbusClient with its circuit breaker,
+the coordinator's AdaptivePollScheduler and PollDecisions) against simulated units for a virtual day, with
+gateway outages and occasional user writes, in a few seconds of CPU time.
+The last ``--frost-units`` units sit in an unheated building, so their
+supply air goes below zero. Reports Modbus transactions, how stale the
+cached data was and how often a unit showed a temperature far from the
+device's (a sign or encoding error; staleness alone stays well within it).
+
+    python tools/simulate_day.py --hours 24 --outage 7200:300 --outage 34200:1800
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from _integration import ROOT, load
+
+sys.path.insert(0, str(ROOT))
+from simulator import LoopbackBus, MadelonDevice, VirtualClock  # noqa: E402
+from simulator import virtual_time  # noqa: E402
+
+controller = load("fresh_air_controller")
+const = load("const")
+scheduler_module = load("scheduler")
+
+DEFAULT_OUTAGES = ["7200:300", "34200:1800", "61200:90"]
+FROST_CLIMATE = {"indoor_temperature": -2.0, "outdoor_temperature": -18.0}
+TEMPERATURE_TOLERANCE = 5.0  # °C between shown and actual supply air
+
+
+class LoopbackModbusClient(controller.ModbusClient):
+    """ModbusClient whose transport is the in-memory loopback bus."""
+
+    def __init__(self, bus, clock):
+        super().__init__("loopback", 0, clock=clock)
+        self._bus = bus
+
+    def _create_client(self):
+        return self._bus.client(timeout=self.request_timeout, retries=self.request_retries)
+
+
+class Stats:
+    def __init__(self):
+        self.polls = 0
+        self.failed_polls = 0
+        self.writes = 0
+        self.ages = []
+        self.unknown_seconds = 0.0
+        self.unavailable_seconds = 0.0
+        self.min_temperature = None
+        self.temperature_errors = 0
+
+
+class Coordinator:
+    """The coordinator's polling, minus Home Assistant.
+
+    Decisions come from the production PollDecisions and scheduler; this
+    only stands in for DataUpdateCoordinator's data and refresh timer.
+    """
+
+    def __init__(self, system, scan_interval):
+        self.system = system
+        self.scheduler = scheduler_module.AdaptivePollScheduler(scan_interval, clock=system.clock.monotonic)
+        self.decisions = scheduler_module.PollDecisions(system, self.scheduler)
+        system.set_cache_ttl(self.scheduler.scan_interval)
+        self.data = None
+        self._reschedule = asyncio.Event()
+
+    def push_cache(self):
+        """Same as MadelonCoordinator.async_push_cache."""
+        if self.decisions.writes_finished():
+            self._reschedule.set()
+        self.data = self.system.registers
+
+    async def poll_loop(self, stats):
+        """Same as MadelonCoordinator._async_update_data on its refresh timer."""
+        while True:
+            ok = await self.system.async_poll()
+            data = self.system.registers if ok else None
+            delay = self.decisions.poll_finished(data, self.data)
+            if ok:
+                self.data = data
+            else:
+                stats.failed_polls += 1
+            stats.polls += 1
+            await self._wait(delay)
+
+    async def _wait(self, delay):
+        """Sleep until the next poll; a write restarts the timer with the new delay."""
+        while True:
+            self._reschedule.clear()
+            try:
+                await asyncio.wait_for(self._reschedule.wait(), delay)
+            except asyncio.TimeoutError:
+                return
+            delay = self.scheduler.next_interval()
+
+
+async def user_loop(coordinator, stats, rng, writes_per_day):
+    """Random fan speed changes, like someone using the slider."""
+    if writes_per_day <= 0:
+        return
+    while True:
+        await asyncio.sleep(rng.expovariate(writes_per_day / 86400))
+        speed = rng.randint(1, 3)
+        if await coordinator.system.apply({"power": True, "supply_speed": speed, "exhaust_speed": speed}):
+            coordinator.push_cache()
+            stats.writes += 1
+
+
+async def sampler(systems, devices, clock, stats, interval):
+    """Sample the age and temperature of the data each unit would show."""
+    while True:
+        await asyncio.sleep(interval)
+        for system in systems:
+            if not system.modbus.available:
+                stats.unavailable_seconds += interval
+            snapshot = system.registers
+            if snapshot is None:
+                stats.unknown_seconds += interval
+            else:
+                stats.ages.append(clock.time() - snapshot.timestamp)
+                temperature = system.temperature
+                if temperature is not None:
+                    if stats.min_temperature is None or temperature < stats.min_temperature:
+                        stats.min_temperature = temperature
+                    actual = devices[system.unit_id].supply_temperature
+                    stats.temperature_errors += abs(temperature - actual) > TEMPERATURE_TOLERANCE
+
+
+def summarize(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "mean_s": round(sum(ordered) / len(ordered), 2),
+        "p50_s": round(ordered[len(ordered) // 2], 2),
+        "p99_s": round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))], 2),
+        "max_s": round(ordered[-1], 2),
+    }
+
+
+def parse_outage(text):
+    start, duration = (float(part) for part in text.split(":"))
+    return start, start + duration
+
+
+async def scenario(args, clock):
+    rng = random.Random(args.seed)
+    outages = [parse_outage(text) for text in (args.outage or DEFAULT_OUTAGES)]
+    devices = {
+        unit_id: MadelonDevice(
+            clock=clock.monotonic,
+            rng=random.Random(rng.random()),
+            **(FROST_CLIMATE if unit_id > args.units - args.frost_units else {}),
+        )
+        for unit_id in range(1, args.units + 1)
+    }
+    bus = LoopbackBus(devices, latency=args.latency, jitter=args.jitter, outages=outages,
+                      clock=clock.monotonic, rng=random.Random(rng.random()))
+    modbus = LoopbackModbusClient(bus, clock)
+    modbus.breaker._rand = random.Random(rng.random()).random
+
+    stats = Stats()
+    systems = []
+    tasks = []
+    for unit_id in devices:
+        system = controller.FreshAirSystem("loopback", 0, unit_id, modbus=modbus, clock=clock,
+                                           scan_interval=args.scan_interval)
+        coordinator = Coordinator(system, args.scan_interval)
+        systems.append(system)
+        tasks.append(asyncio.create_task(coordinator.poll_loop(stats)))
+        tasks.append(asyncio.create_task(
+            user_loop(coordinator, stats, random.Random(rng.random()), args.writes_per_day)
+        ))
+    tasks.append(asyncio.create_task(sampler(systems, devices, clock, stats, args.sample_interval)))
+
+    await asyncio.sleep(args.hours * 3600)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for system in systems:
+        system.close()
+    modbus.close()
+
+    return {
+        "virtual_hours": args.hours,
+        "units": args.units,
+        "scan_interval": args.scan_interval,
+        "outages": [[start, end - start] for start, end in outages],
+        "transactions": bus.transactions,
+        "transactions_per_unit_hour": round(bus.transactions / args.units / args.hours, 1),
+        "bytes_received": sum(unit.bytes_received for unit in modbus.metrics.units.values()),
+        "polls": stats.polls,
+        "failed_polls": stats.failed_polls,
+        "writes": stats.writes,
+        "reconnects": modbus.metrics.reconnects,
+        "staleness": summarize(stats.ages),
+        "unknown_seconds": stats.unknown_seconds,
+        "unavailable_seconds": stats.unavailable_seconds,
+        "min_temperature": stats.min_temperature,
+        "temperature_errors": stats.temperature_errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--units", type=int, default=2)
+    parser.add_argument("--frost-units", type=int, default=1, help="units whose supply air is below zero")
+    parser.add_argument("--scan-interval", type=float, default=const.DEFAULT_SCAN_INTERVAL)
+    parser.add_argument("--outage", action="append", metavar="START:DURATION",
+                        help=f"gateway outage in seconds from the start (default: {' '.join(DEFAULT_OUTAGES)})")
+    parser.add_argument("--writes-per-day", type=float, default=8)
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--sample-interval", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    clock = VirtualClock()
+    cpu, wall = time.process_time(), time.perf_counter()
+    result = virtual_time.run(scenario(args, clock), clock)
+    result["cpu_seconds"] = round(time.process_time() - cpu, 2)
+    result["wall_seconds"] = round(time.perf_counter() - wall, 2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Reload soak test for the entry lifecycle.
+
+Creates config entries through the config flow in a real Home Assistant
+instance (see _integration.async_home_assistant), then unloads and sets them
+all up again N times against dummy_server.py. Every cycle runs
+async_unload_entry and async_setup_entry: platforms and their entity
+listeners, the coordinator and its first refresh, the per-entry snapshot
+store, and the shared gateway connection, which is closed when the last
+entry unloads. A fan speed change per entry adds a write and its read-back.
+Fails when memory, asyncio tasks, open file descriptors, event bus listeners
+or per-entry stores keep growing, or when anything is left after the final
+unload. Needs homeassistant installed.
+
+Home Assistant 2024.11 keeps every EntityPlatform of an unloaded entry in
+DATA_ENTITY_PLATFORM (EntityComponent.async_unload_entry resets the platform
+but never destroys it). Those emptied platforms are dropped after each cycle
+and counted separately, so they don't hide or fake a leak of our own.
+
+    python dummy_server.py &
+    python tools/soak_reload.py --cycles 1000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+from _integration import async_home_assistant
+
+DOMAIN = "madelon_ventilation"
+
+
+def open_fds():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except FileNotFoundError:  # not Linux
+        return 0
+
+
+def sample(hass, const):
+    gc.collect()
+    return {
+        "memory": tracemalloc.get_traced_memory()[0],
+        "tasks": len(asyncio.all_tasks()),
+        "fds": open_fds(),
+        "listeners": sum(hass.bus.async_listeners().values()),
+        "stores": len(hass.data.get(const.DATA_STORES, {})),
+    }
+
+
+async def add_entries(hass, host, port, unit_ids):
+    """Create one entry per unit the way the UI does."""
+    from homeassistant.const import CONF_HOST, CONF_PORT
+    from custom_components.madelon_ventilation.const import CONF_UNIT_ID
+
+    for unit_id in unit_ids:
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN,
+            context={"source": "user"},
+            data={CONF_HOST: host, CONF_PORT: port, CONF_UNIT_ID: unit_id},
+        )
+        if result["type"] != "create_entry":
+            raise RuntimeError(f"Config flow for unit {unit_id} ended with {result}")
+    await hass.async_block_till_done(wait_background_tasks=True)
+    return hass.config_entries.async_entries(DOMAIN)
+
+
+def drop_unloaded_platforms(hass):
+    """Remove this integration's emptied EntityPlatforms, as async_destroy would; return how many."""
+    from homeassistant.helpers.entity_platform import DATA_ENTITY_PLATFORM
+
+    dropped = 0
+    for platforms in hass.data.get(DATA_ENTITY_PLATFORM, {}).values():
+        stale = [
+            platform for platform in platforms
+            if platform.config_entry is not None
+            and platform.config_entry.domain == DOMAIN
+            and not platform.entities
+        ]
+        for platform in stale:
+            platforms.remove(platform)
+        dropped += len(stale)
+    return dropped
+
+
+def fan_entity_id(hass, entry):
+    from homeassistant.helpers import entity_registry as er
+
+    registry = er.async_get(hass)
+    for entity in er.async_entries_for_config_entry(registry, entry.entry_id):
+        if entity.domain == "fan":
+            return entity.entity_id
+    raise RuntimeError(f"No fan entity for {entry.title}")
+
+
+async def cycle(hass, entries, percentage):
+    """Unload every entry, set them all up again, then a poll and a write on each.
+
+    Returns the number of emptied platforms Home Assistant left behind.
+    """
+    # All entries first, so the last release really closes the gateway connection
+    for entry in entries:
+        if not await hass.config_entries.async_unload(entry.entry_id):
+            raise RuntimeError(f"Unload failed for {entry.title}")
+    for entry in entries:
+        if not await hass.config_entries.async_setup(entry.entry_id):
+            raise RuntimeError(f"Setup failed for {entry.title}")
+    # The first refresh runs as a background task of the entry
+    await hass.async_block_till_done(wait_background_tasks=True)
+    for entry in entries:
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        if not coordinator.last_update_success:
+            raise RuntimeError(f"First refresh failed for {entry.title}")
+        await hass.services.async_call(
+            "fan", "set_percentage",
+            {"entity_id": fan_entity_id(hass, entry), "percentage": percentage},
+            blocking=True,
+        )
+    await hass.async_block_till_done()
+    return drop_unloaded_platforms(hass)
+
+
+async def main(args):
+    tracemalloc.start()
+    async with async_home_assistant() as hass:
+        from custom_components.madelon_ventilation import const
+
+        entries = await add_entries(hass, args.host, args.port, list(range(1, args.units + 1)))
+
+        # Warm up caches (imports, pymodbus framers, translations) before the baseline
+        for index in range(args.warmup):
+            await cycle(hass, entries, 33 + 33 * (index % 2))
+        baseline = sample(hass, const)
+
+        durations = []
+        dropped = 0
+        memory = []  # (cycle, traced bytes) at every report
+        for index in range(1, args.cycles + 1):
+            started = time.perf_counter()
+            dropped += await cycle(hass, entries, 33 + 33 * (index % 2))
+            durations.append(time.perf_counter() - started)
+            if index % args.report == 0:
+                current = sample(hass, const)
+                memory.append((index, current["memory"]))
+                print(
+                    f"cycle {index:5d}: "
+                    + ", ".join(f"{key} {current[key] - baseline[key]:+d}" for key in current)
+                )
+        # Let closed transports finish their callbacks
+        await asyncio.sleep(0.1)
+        final = sample(hass, const)
+        memory.append((args.cycles, final["memory"]))
+
+        failures = [
+            f"{key} grew from {baseline[key]} to {final[key]}"
+            for key in ("tasks", "fds", "listeners", "stores")
+            if final[key] > baseline[key]
+        ]
+        # Lowest sample of each half: a leak raises the floor, a store being
+        # serialized in the executor at sampling time does not
+        first = min((value for index, value in memory if index <= args.cycles // 2), default=baseline["memory"])
+        second = min(value for index, value in memory if index > args.cycles // 2)
+        if second - first > args.memory_slack:
+            failures.append(f"traced memory floor grew by {second - first} bytes over the second half")
+
+        for entry in entries:
+            await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        if hass.data.get(DOMAIN):
+            failures.append(f"entry data left after unload: {list(hass.data[DOMAIN])}")
+        if len(hass.data.get(const.DATA_HUB, ())):
+            failures.append("gateway connection still open after the last unload")
+
+    durations.sort()
+    print(
+        f"cycle time: mean {1000 * sum(durations) / len(durations):.1f} ms, "
+        f"p50 {1000 * durations[len(durations) // 2]:.1f} ms, "
+        f"p99 {1000 * durations[min(len(durations) - 1, int(0.99 * len(durations)))]:.1f} ms"
+    )
+    print(f"emptied platforms left by Home Assistant and dropped: {dropped}")
+    for failure in failures:
+        print(f"LEAK: {failure}")
+    if not failures:
+        print(
+            f"OK: {args.cycles} reloads, no growth in tasks, fds, listeners or stores, "
+            f"memory floor {second - first:+d} bytes over the second half"
+        )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--cycles", type=int, default=1000)
+    parser.add_argument("--units", type=int, default=1, help="entries sharing the gateway")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--report", type=int, default=100)
+    parser.add_argument("--memory-slack", type=int, default=64 * 1024,
+                        help="allowed traced memory growth in bytes")
+    sys.exit(asyncio.run(main(parser.parse_args())))